@@ -0,0 +1,182 @@
+# This file benchmarks the DCM serial protocol against the virtual pacemaker (no hardware needed).
+#
+#   python -m benchmarks.protocol_bench --out bench.json
+#   python -m benchmarks.protocol_bench --device loopback   protocol code alone, no pty / OS buffers
+#
+# Results are written as JSON so runs from different versions can be diffed.
+from __future__ import annotations
+from typing import Callable, Dict, Any, List
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from modules.Serial_Manager import SerialManager, K_ECHO
+from modules.Communication import PacemakerCommunication
+from modules.Device_Simulator import PtySimulator, LoopbackSimulator, max_frame_rate
+from modules.mode_config import ParamEnum
+
+UI_PARAMS = ParamEnum().get_default_values()
+
+def _throughput(fn: Callable[[], Any], seconds: float) -> Dict[str, Any]:
+    """Call fn repeatedly for about `seconds`; report calls per second."""
+    n = 0
+    batch = 1000
+    start = time.perf_counter()
+    deadline = start + seconds
+    while True:
+        for _ in range(batch):
+            fn()
+        n += batch
+        now = time.perf_counter()
+        if now >= deadline:
+            break
+    elapsed = now - start
+    return {"ops": n, "seconds": round(elapsed, 4), "ops_per_sec": round(n / elapsed, 1)}
+
+def _latency(samples_s: List[float], failures: int) -> Dict[str, Any]:
+    ms = sorted(s * 1000.0 for s in samples_s)
+    if not ms:
+        return {"n": 0, "failures": failures}
+    return {
+        "n": len(ms),
+        "failures": failures,
+        "mean_ms": round(statistics.fmean(ms), 3),
+        "p50_ms": round(ms[len(ms) // 2], 3),
+        "p95_ms": round(ms[min(len(ms) - 1, int(len(ms) * 0.95))], 3),
+        "max_ms": round(ms[-1], 3),
+    }
+
+def bench_codec(seconds: float) -> Dict[str, Any]:
+    sm = SerialManager()
+    comm = PacemakerCommunication()
+    fw = comm._prepare_firmware_params(0, UI_PARAMS)
+    frame = sm.build_data_packet(mode=0, params=fw)
+    data = frame[4:34]
+    return {
+        "build_data_packet": _throughput(lambda: sm.build_data_packet(mode=0, params=fw), seconds),
+        "build_data_frame": _throughput(lambda: sm.build_data_frame(mode=0, params=fw), seconds),
+        "request_frame": _throughput(lambda: sm.build_packet(K_ECHO), seconds),
+        "decode_params": _throughput(lambda: sm.decode_params(data), seconds),
+    }
+
+def bench_upload(comm: PacemakerCommunication, rounds: int) -> Dict[str, Any]:
+    samples, failures = [], 0
+    for _ in range(rounds):
+        t0 = time.perf_counter()
+        res = comm.upload_parameters(0, UI_PARAMS)
+        dt = time.perf_counter() - t0
+        if res.get("success"):
+            samples.append(dt)
+        else:
+            failures += 1
+    comm.serial_mgr.flush_buffers()  # drop any acknowledgements nobody consumed
+    return _latency(samples, failures)
+
+def bench_download(comm: PacemakerCommunication, rounds: int) -> Dict[str, Any]:
+    samples, failures = [], 0
+    for _ in range(rounds):
+        t0 = time.perf_counter()
+        res = comm.download_parameters()
+        dt = time.perf_counter() - t0
+        if res.get("success"):
+            samples.append(dt)
+        else:
+            failures += 1
+    return _latency(samples, failures)
+
+def bench_egram(comm: PacemakerCommunication, seconds: float, rate: float) -> Dict[str, Any]:
+    # EGdiagram pulls in Tk/matplotlib; only import it for this case
+    from modules.EGdiagram import PacemakerEgramSource
+    source = PacemakerEgramSource(comm)
+    stream = source.stream()
+    samples = batches = 0
+    start = time.perf_counter()
+    try:
+        for batch in stream:
+            samples += len(batch)
+            batches += 1
+            if time.perf_counter() - start >= seconds:
+                break
+    finally:
+        stream.close()  # sends K_ESTOP
+    elapsed = time.perf_counter() - start
+    comm.serial_mgr.flush_buffers()
+    framer = comm.serial_mgr.framer.stats()
+    return {
+        "device_rate_hz": round(rate, 1),
+        "frames": samples,
+        "batches": batches,
+        "seconds": round(elapsed, 3),
+        "frames_per_sec": round(samples / elapsed, 1),
+        "framer": framer,
+    }
+
+def _git_rev() -> str:
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"],
+                                       stderr=subprocess.DEVNULL, text=True).strip()
+    except Exception:
+        return "unknown"
+
+def run(args) -> Dict[str, Any]:
+    results: Dict[str, Any] = {"codec": bench_codec(args.codec_seconds)}
+    rate = args.egram_rate or max_frame_rate(args.baudrate)
+    if args.device == "loopback":
+        sim = LoopbackSimulator(egram_rate=rate)
+        make_comm = lambda: PacemakerCommunication(transport=sim.transport, baudrate=args.baudrate)
+    else:
+        sim = PtySimulator(egram_rate=rate, baudrate=args.baudrate)
+        make_comm = lambda: PacemakerCommunication(port=sim.port, baudrate=args.baudrate)
+    with sim:
+        comm = make_comm()
+        if not comm.connect():
+            raise SystemExit(f"could not open simulator port {sim.port}")
+        try:
+            results["upload_round_trip"] = bench_upload(comm, args.rounds)
+            results["echo_download"] = bench_download(comm, args.rounds)
+            if not args.skip_egram:
+                results["egram_stream"] = bench_egram(comm, args.egram_seconds, sim.egram_rate)
+        finally:
+            comm.disconnect()
+    return {
+        "meta": {
+            "git_rev": _git_rev(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "device": "{} simulator".format(args.device),
+            "baudrate": args.baudrate,
+        },
+        "results": results,
+    }
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="DCM protocol throughput / latency benchmarks")
+    parser.add_argument("--out", default="bench_results.json", help="JSON output path ('-' for stdout only)")
+    parser.add_argument("--rounds", type=int, default=10, help="upload / download repetitions")
+    parser.add_argument("--codec-seconds", type=float, default=1.0)
+    parser.add_argument("--egram-seconds", type=float, default=3.0)
+    parser.add_argument("--egram-rate", type=float, default=0.0, help="simulated frames/s (default: UART limit)")
+    parser.add_argument("--baudrate", type=int, default=115200)
+    parser.add_argument("--device", choices=("pty", "loopback"), default="pty",
+                        help="simulator behind a pseudo-terminal, or in memory via Transport.LoopbackTransport")
+    parser.add_argument("--skip-egram", action="store_true", help="skip the stream case (no Tk/matplotlib needed)")
+    args = parser.parse_args(argv)
+
+    report = run(args)
+    text = json.dumps(report, indent=2)
+    print(text)
+    if args.out != "-":
+        with open(args.out, "w") as f:
+            f.write(text + "\n")
+    return 0
+
+if __name__ == "__main__":
+    raise SystemExit(main())
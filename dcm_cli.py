@@ -0,0 +1,88 @@
+# Headless DCM: program one pacemaker from a parameters.json-style file, no GUI or login.
+#
+#   python dcm_cli.py --port /dev/ttyACM0 --params data/parameters.json
+#   python dcm_cli.py --list-ports
+#
+# Exit status: 0 programmed and verified, 1 device did not verify,
+# 2 bad arguments / parameter file, 3 could not connect.
+# Only the serial stack is imported (no tkinter / matplotlib) so it starts fast.
+import argparse
+import json
+import sys
+
+from modules.Communication import PacemakerCommunication
+from modules.Multi_Programmer import MODES, load_parameter_file
+from modules.Serial_Manager import SerialManager
+
+EXIT_OK, EXIT_NOT_VERIFIED, EXIT_USAGE, EXIT_NO_DEVICE = 0, 1, 2, 3
+
+def _pick_port(port):
+    if port:
+        return port
+    ports = SerialManager.list_available_ports()
+    if len(ports) == 1:
+        return ports[0]
+    if not ports:
+        print("No serial ports found; pass --port", file=sys.stderr)
+    else:
+        print("Several serial ports found ({}); pass --port".format(", ".join(ports)), file=sys.stderr)
+    return None
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Program and verify a pacemaker without the GUI")
+    parser.add_argument("--port", help="serial port (default: the only port found)")
+    parser.add_argument("--params", default="data/parameters.json", help="parameter file to program")
+    parser.add_argument("--mode", choices=MODES, help="pacing mode (default: Pacing_Mode from the file)")
+    parser.add_argument("--baudrate", type=int, default=115200)
+    parser.add_argument("--timeout", type=float, default=2.0, help="echo timeout in seconds")
+    parser.add_argument("--no-verify", action="store_true", help="upload only, skip the read-back")
+    parser.add_argument("--list-ports", action="store_true", help="print the serial ports found and exit")
+    parser.add_argument("--json", action="store_true", help="print the result dict as JSON")
+    args = parser.parse_args(argv)
+
+    if args.list_ports:
+        for p in SerialManager.list_available_ports():
+            print(p)
+        return EXIT_OK
+
+    try:
+        params = load_parameter_file(args.params)
+    except (OSError, ValueError) as e:
+        print("Invalid parameter file {}: {}".format(args.params, e), file=sys.stderr)
+        return EXIT_USAGE
+    mode_name = args.mode or params.get("Pacing_Mode", "AOO")
+    params.pop("Pacing_Mode", None)
+    if mode_name not in MODES:
+        print("Unknown pacing mode: {}".format(mode_name), file=sys.stderr)
+        return EXIT_USAGE
+
+    port = _pick_port(args.port)
+    if port is None:
+        return EXIT_USAGE
+
+    comm = PacemakerCommunication(port=port, baudrate=args.baudrate)
+    if not comm.connect():
+        print("Could not open {}".format(port), file=sys.stderr)
+        return EXIT_NO_DEVICE
+    try:
+        mode = MODES.index(mode_name)
+        if args.no_verify:
+            result = comm.upload_parameters(mode, params)
+            ok = result["success"]
+        else:
+            result = comm.program_and_verify(mode, params, timeout=args.timeout)
+            ok = result["success"] and result["verified"]
+    finally:
+        comm.disconnect()
+
+    if args.json:
+        print(json.dumps(result, indent=2))
+    else:
+        print("{} [{}] {}: {}".format(port, mode_name, "OK" if ok else "FAILED", result["message"]))
+        for key, d in result.get("diff", {}).items():
+            if not d["ok"]:
+                print("  {}: sent {}, device has {}".format(key, d["sent"], d["received"]))
+    return EXIT_OK if ok else EXIT_NOT_VERIFIED
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,7 +1,11 @@
+import os
+if os.environ.get("DCM_IMPORT_PROFILE"):
+    from modules import Startup_Profile
+    Startup_Profile.enable()
 import tkinter as tk
 from tkinter import messagebox
 from modules.auth import register_user, login_user
-from modules.dashboard import DashboardWindow
+# The dashboard (and everything it pulls in) is imported after a successful login
 
 class WelcomeWindow: # Initial login and registration window
     def __init__(self, root):
@@ -32,15 +36,24 @@ class WelcomeWindow: # Initial login and registration window
         msg = login_user(name, password)
         if msg == "Login successful":
             self.root.destroy()
+            from modules.dashboard import DashboardWindow
             root = tk.Tk()
             DashboardWindow(root, name)
+            _report_startup(root, "dashboard shown")
             root.mainloop()
         else:
             messagebox.showerror("Login", msg)
 
+def _report_startup(root, label, check_budget=False):
+    # DCM_IMPORT_PROFILE=1: print import costs once the window has been drawn
+    if os.environ.get("DCM_IMPORT_PROFILE"):
+        from modules import Startup_Profile
+        root.after_idle(lambda: Startup_Profile.checkpoint(label, check_budget=check_budget))
+
 def main():
     root = tk.Tk()
     app = WelcomeWindow(root)
+    _report_startup(root, "login window shown", check_budget=True)
     root.mainloop()
 
 if __name__ == "__main__":
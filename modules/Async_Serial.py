@@ -0,0 +1,687 @@
+# This file provides the event-driven core of the pacemaker link: asyncio I/O and the protocol, with a Tk bridge.
+from __future__ import annotations
+from typing import Any, AsyncIterator, Callable, Dict, Optional, TYPE_CHECKING
+from collections import deque
+import asyncio
+import concurrent.futures
+import os
+import queue
+import threading
+import time
+
+try:
+    from .Serial_Manager import SerialManager, K_ECHO, K_PPARAMS, K_EGRAM, K_ESTOP, COMMAND_FRAMES
+    from .Serial_Capture import TappedPort
+    from .Transport import BufferedTransport, TransportError
+    from .Param_Codec import PARAM_CODEC, PARAM_KEYS
+    from .auth import get_or_assign_device_name, set_last_connected_device
+except ImportError:
+    from modules.Serial_Manager import SerialManager, K_ECHO, K_PPARAMS, K_EGRAM, K_ESTOP, COMMAND_FRAMES
+    from modules.Serial_Capture import TappedPort
+    from modules.Transport import BufferedTransport, TransportError
+    from modules.Param_Codec import PARAM_CODEC, PARAM_KEYS
+    from modules.auth import get_or_assign_device_name, set_last_connected_device
+
+if TYPE_CHECKING:
+    import numpy as np
+
+# Allowed |sent - echoed| per firmware field (firmware units) for program_and_verify().
+# Amplitudes and sensitivities are V*100, so 10 = 0.1 V; everything else must match.
+VERIFY_TOLERANCES: Dict[str, int] = {
+    "p_aPaceAmp": 10, "p_vPaceAmp": 10,
+    "p_aSens": 10, "p_vSens": 10,
+}
+
+# ---------- Shared I/O loop ----------
+_io_loop: Optional[asyncio.AbstractEventLoop] = None
+_io_thread: Optional[threading.Thread] = None
+_io_start = threading.Lock()
+
+def io_loop() -> asyncio.AbstractEventLoop:
+    """
+    The process-wide event loop (on a daemon thread, started on first use) that
+    the blocking API and TkAsyncBridge run the async core on, so every open
+    link is served by one loop instead of a thread per caller.
+    """
+    global _io_loop, _io_thread
+    with _io_start:
+        if _io_loop is None:
+            _io_loop = asyncio.new_event_loop()
+            _io_thread = threading.Thread(target=_io_loop.run_forever, name="dcm-io", daemon=True)
+            _io_thread.start()
+        return _io_loop
+
+def run_blocking(coro, timeout: Optional[float] = None) -> Any:
+    """Run coro on io_loop() and wait for its result (from any thread but the loop's own)."""
+    loop = io_loop()
+    if threading.current_thread() is _io_thread:
+        coro.close()
+        raise RuntimeError("blocking call on the I/O loop; await the coroutine instead")
+    return asyncio.run_coroutine_threadsafe(coro, loop).result(timeout)
+
+class AsyncSerialManager:
+    """
+    asyncio-native I/O for one pacemaker link.
+
+    The port is opened through a regular SerialManager (self.sync keeps the
+    configuration, frame building and capture in one place); from then on this
+    class is the only reader and is driven by the event loop, not port timeouts:
+      - serial ports: loop.add_reader() on the file descriptor, so bytes reach
+        the PacketFramer as soon as the OS has them
+      - in-memory / TCP transports: their on_receive hook schedules a drain
+      - anything else (capture replay, Windows COM handles): a non-blocking
+        read every poll_interval seconds
+    Complete frames are queued apart as K_EGRAM samples and replies, so an
+    egram consumer never swallows an acknowledgement. While installed,
+    SerialManager.read_packet() / read_frames() wait on these queues (see
+    SerialManager.reader), which makes the blocking API a wrapper of this one.
+    """
+
+    def __init__(self, port: str = "COM3", baudrate: int = 115200, poll_interval: float = 0.005,
+                 transport=None) -> None:
+        self.sync = SerialManager(port=port, baudrate=baudrate, timeout=0, transport=transport)
+        self.poll_interval = poll_interval
+        self._cond = threading.Condition()   # guards both queues; blocking readers wait on it
+        self._egram: deque = deque()
+        self._replies: deque = deque()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._ready: Optional[asyncio.Event] = None
+        self._fd: Optional[int] = None
+        self._hooked: Optional[BufferedTransport] = None
+        self._poll_task: Optional[asyncio.Task] = None
+        self._drain_pending = False
+
+    @property
+    def port(self) -> str:
+        return self.sync.port
+
+    @property
+    def framer(self):
+        return self.sync.framer
+
+    def is_connected(self) -> bool:
+        return self.sync.is_connected()
+
+    def _open(self) -> bool:
+        return self.sync.connect() and self.sync.flush_buffers()
+
+    async def connect(self) -> bool:
+        """Open the port (on the executor: opening can block) and start reading it from the loop."""
+        loop = asyncio.get_running_loop()
+        if not await loop.run_in_executor(None, self._open):
+            return False
+        self._loop = loop
+        self._ready = asyncio.Event()
+        self._install()
+        return True
+
+    async def disconnect(self) -> None:
+        await asyncio.get_running_loop().run_in_executor(None, self.sync.disconnect)
+
+    def _install(self) -> None:
+        with self._cond:
+            self._egram.clear()
+            self._replies.clear()
+        sp = self.sync.serial_port
+        raw = sp._port if isinstance(sp, TappedPort) else sp
+        try:
+            fd = raw.fileno()
+        except Exception:
+            fd = None
+        if fd is not None:
+            try:
+                self._loop.add_reader(fd, self._on_readable)
+                self._fd = fd
+            except (NotImplementedError, ValueError, OSError):
+                pass  # e.g. the proactor loop on Windows
+        if self._fd is None and isinstance(raw, BufferedTransport):
+            self._hooked = raw
+            raw.on_receive = self._schedule_drain
+        self.sync.reader = self
+        if self._hooked is not None:
+            self._schedule_drain()  # anything that arrived before the hook was set
+        elif self._fd is None:
+            self._poll_task = self._loop.create_task(self._poll())
+
+    def _release(self) -> None:
+        """Stop reading; SerialManager calls this (from any thread) before it closes or reopens the port."""
+        if self._hooked is not None:
+            self._hooked.on_receive = None
+            self._hooked = None
+        with self._cond:
+            self._cond.notify_all()
+        loop = self._loop
+        if loop is None:
+            return
+        if self._on_loop():
+            self._stop_reading(self._fd)
+        else:
+            try:
+                loop.call_soon_threadsafe(self._stop_reading, self._fd)
+            except RuntimeError:
+                pass  # loop already closed
+
+    def _stop_reading(self, fd: Optional[int]) -> None:
+        if fd is not None and fd == self._fd:
+            self._loop.remove_reader(fd)
+            self._fd = None
+        if self._poll_task is not None:
+            self._poll_task.cancel()
+            self._poll_task = None
+        self._ready.set()  # wake async waiters so they see the link is gone
+
+    def _on_loop(self) -> bool:
+        try:
+            return asyncio.get_running_loop() is self._loop
+        except RuntimeError:
+            return False
+
+    # ---------- Receive (loop thread) ----------
+    def _on_readable(self) -> None:
+        try:
+            data = os.read(self._fd, 4096)
+        except BlockingIOError:
+            return
+        except OSError as e:
+            self._lost(e)
+            return
+        if not data:
+            self._lost(TransportError("end of file"))
+            return
+        tap = self.sync.tap   # reading the fd bypasses TappedPort
+        if tap is not None:
+            tap.rx(data)
+        self._push(data)
+
+    def _schedule_drain(self) -> None:
+        # Called on whichever thread delivered the bytes
+        if not self._drain_pending:
+            self._drain_pending = True
+            try:
+                self._loop.call_soon_threadsafe(self._drain)
+            except RuntimeError:
+                pass
+
+    def _drain(self) -> None:
+        self._drain_pending = False
+        if self.sync.reader is not self:
+            return
+        sp = self.sync.serial_port
+        try:
+            if sp is None or not sp.is_open:
+                raise TransportError("link closed")
+            waiting = sp.in_waiting
+            if waiting:
+                self._push(sp.read(waiting))
+        except OSError as e:
+            self._lost(e)
+
+    async def _poll(self) -> None:
+        while self.sync.reader is self:
+            self._drain()
+            await asyncio.sleep(self.poll_interval)
+
+    def _push(self, data: bytes) -> None:
+        frames = self.sync.framer.feed(data)
+        if not frames:
+            return
+        with self._cond:
+            for f in frames:
+                (self._egram if f[2] == K_EGRAM else self._replies).append(f)
+            self._cond.notify_all()
+        self._ready.set()
+
+    def _lost(self, err: Exception) -> None:
+        if self.sync.reader is self:
+            self.sync._link_lost(err)
+
+    # ---------- Queues ----------
+    def _take_egram(self) -> bytes:
+        with self._cond:
+            frames = b"".join(self._egram)
+            self._egram.clear()
+        return frames
+
+    def discard_replies(self) -> None:
+        """Drop queued replies (egram samples are kept), e.g. before a new exchange."""
+        with self._cond:
+            self._replies.clear()
+
+    def discard_input(self) -> None:
+        """Drop everything received so far, including a partly received frame."""
+        with self._cond:
+            self._egram.clear()
+            self._replies.clear()
+        if self._on_loop():
+            self.sync.framer.reset()
+        elif self._loop is not None:
+            try:
+                self._loop.call_soon_threadsafe(self.sync.framer.reset)
+            except RuntimeError:
+                pass
+
+    async def _wait(self, q: deque, timeout: float) -> bool:
+        deadline = time.monotonic() + timeout
+        while not q:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0 or self.sync.reader is not self:
+                return False
+            self._ready.clear()
+            try:
+                await asyncio.wait_for(self._ready.wait(), remaining)
+            except asyncio.TimeoutError:
+                return False
+        return True
+
+    async def read_frame(self, timeout: float = 2.0) -> bytes:
+        """Next reply frame (anything but K_EGRAM), or b"" on timeout / disconnect."""
+        if not await self._wait(self._replies, timeout):
+            return b""
+        with self._cond:
+            return self._replies.popleft() if self._replies else b""
+
+    async def read_frames(self, timeout: float = 0.05) -> bytes:
+        """All queued K_EGRAM frames, concatenated; waits up to timeout for the first."""
+        if not await self._wait(self._egram, timeout):
+            return b""
+        return self._take_egram()
+
+    def _check_blocking(self) -> None:
+        if self._on_loop():
+            raise RuntimeError("blocking read on the event loop; await read_frame() instead")
+
+    def wait_reply(self, timeout: float) -> bytes:
+        """Blocking read_frame() for other threads (SerialManager.read_packet())."""
+        self._check_blocking()
+        with self._cond:
+            self._cond.wait_for(lambda: self._replies or self.sync.reader is not self, timeout)
+            return self._replies.popleft() if self._replies else b""
+
+    def wait_egram(self, timeout: float) -> bytes:
+        """Blocking read_frames() for other threads (SerialManager.read_frames())."""
+        self._check_blocking()
+        with self._cond:
+            if not self._egram and self.sync.reader is self:
+                self._cond.wait(timeout)
+            frames = b"".join(self._egram)
+            self._egram.clear()
+        return frames
+
+    # ---------- Send ----------
+    async def send(self, data) -> bool:
+        """Write all bytes without blocking the loop; True once fully written."""
+        if self.sync.reader is not self:
+            return False
+        if self._fd is None:
+            # In-memory and TCP transports take a frame without waiting
+            return self.sync.send_data(data)
+        view = memoryview(bytes(data))
+        fd = self._fd
+        try:
+            while view:
+                try:
+                    with self.sync.io_lock:
+                        n = os.write(fd, view)
+                except BlockingIOError:
+                    n = 0
+                if n:
+                    tap = self.sync.tap
+                    if tap is not None:
+                        tap.tx(bytes(view[:n]))
+                    view = view[n:]
+                    continue
+                writable = self._loop.create_future()
+                self._loop.add_writer(fd, lambda: writable.done() or writable.set_result(None))
+                try:
+                    await writable
+                finally:
+                    self._loop.remove_writer(fd)
+            return True
+        except OSError as e:
+            self._lost(e)
+            return False
+
+class AsyncPacemakerCommunication:
+    """
+    Pacemaker protocol (parameter upload, download, program-and-verify, egram)
+    on top of AsyncSerialManager. This is the implementation:
+    Communication.PacemakerCommunication runs these coroutines on io_loop()
+    for blocking callers. Exchanges on one link take turns; an egram stream
+    keeps running meanwhile because samples and replies are queued apart.
+    """
+
+    def __init__(self, port: str = "COM3", baudrate: int = 115200, ack_timeout: float = 0.5,
+                 transport=None) -> None:
+        self.serial_mgr = AsyncSerialManager(port=port, baudrate=baudrate, transport=transport)
+        self.is_connected = False
+        self.ack_timeout = ack_timeout  # max wait for the device to acknowledge K_PPARAMS
+        self._exchange = asyncio.Lock()
+
+    def _prepare_firmware_params(self, mode, ui_params):
+        """UI-named parameters -> firmware units; missing or invalid values fall back to defaults."""
+        p = PARAM_CODEC.ui_to_firmware(mode, ui_params)
+        p["p_pacingState"] = 1
+        return p
+
+    def get_connection_status(self) -> bool:
+        return self.is_connected and self.serial_mgr.is_connected()
+
+    async def connect(self) -> bool:
+        self._exchange = asyncio.Lock()  # bound to the loop this connection runs on
+        self.is_connected = await self.serial_mgr.connect()
+        return self.is_connected
+
+    async def disconnect(self) -> None:
+        if self.is_connected:
+            await self.serial_mgr.disconnect()
+            self.is_connected = False
+
+    async def check_device_identity(self) -> Dict[str, Any]:
+        """
+        Check and return the identity of the connected pacemaker device.
+        Updates the "last_connected_device_name" in the JSON file.
+        """
+        current_logical_name = None
+        port_name = self.serial_mgr.port
+        if self.is_connected and port_name:
+            try:
+                loop = asyncio.get_running_loop()
+                current_logical_name = await loop.run_in_executor(None, get_or_assign_device_name, port_name)
+                if current_logical_name:
+                    await loop.run_in_executor(None, set_last_connected_device, current_logical_name)
+            except Exception as e:
+                print(f"Error getting device name: {e}")
+                current_logical_name = None
+        return {
+            "device_id": current_logical_name,
+        }
+
+    async def _wait_for(self, fn_codes, timeout: float) -> bytes:
+        """Next reply whose function code is in fn_codes, or b"" once the deadline passes."""
+        deadline = time.monotonic() + timeout
+        while True:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return b""
+            pkt = await self.serial_mgr.read_frame(remaining)
+            if not pkt:
+                return b""
+            if pkt[2] in fn_codes:
+                return pkt
+
+    async def upload_parameters(self, mode, parameters, ack_timeout=None) -> Dict[str, Any]:
+        result = {
+            "success": False,
+            "message": "",
+            "sent_parameters": dict(parameters or {}),
+            "errors": [],
+            "acknowledged": False,
+            "latency_ms": None,
+        }
+
+        if not self.is_connected:
+            result["message"] = "Device not connected"
+            result["errors"].append("Device not connected")
+            return result
+
+        async with self._exchange:
+            try:
+                fw_params = self._prepare_firmware_params(mode, parameters or {})
+
+                frame = self.serial_mgr.sync.build_data_packet(mode=mode, params=fw_params)
+                if not frame:
+                    result["message"] = "Failed to build data packet"
+                    result["errors"].append("Packet build failed")
+                    return result
+
+                # Drop stale replies so an old acknowledgement cannot complete this upload
+                self.serial_mgr.discard_replies()
+                t0 = time.perf_counter()
+                if not await self.serial_mgr.send(frame):
+                    result["message"] = "Parameter transmission failed"
+                    result["errors"].append("Data send failed")
+                    return result
+
+                timeout = self.ack_timeout if ack_timeout is None else ack_timeout
+                acked = bool(await self._wait_for((K_PPARAMS, K_ECHO), timeout))
+                result["latency_ms"] = round((time.perf_counter() - t0) * 1000.0, 3)
+                result["acknowledged"] = acked
+
+                # Without an acknowledgement the frame was still written; firmware that
+                # does not ack simply costs the full deadline, as the fixed sleep did.
+                result["success"] = True
+                if acked:
+                    result["message"] = "Successfully uploaded {} parameters".format(len(parameters or {}))
+                else:
+                    result["message"] = "Uploaded {} parameters (no acknowledgement within {:.1f} s)".format(
+                        len(parameters or {}), timeout)
+
+            except Exception as e:
+                result["message"] = "Upload error: {}".format(str(e))
+                result["errors"].append(str(e))
+
+            return result
+
+    async def download_parameters(self, timeout: float = 2.0) -> Dict[str, Any]:
+        result = {
+            "success": False,
+            "message": "",
+            "parameters": {},
+            "errors": []
+        }
+        if not self.is_connected:
+            result["message"] = "Device not connected"
+            result["errors"].append("Device not connected")
+            return result
+        async with self._exchange:
+            try:
+                self.serial_mgr.discard_replies()
+                if not await self.serial_mgr.send(COMMAND_FRAMES[K_ECHO]):
+                    result["message"] = "Failed to send K_ECHO request"
+                    result["errors"].append("Echo send failed")
+                    return result
+                pkt = await self._wait_for((K_ECHO,), timeout)
+                if not pkt:
+                    result["message"] = "No response from pacemaker"
+                    result["errors"].append("Timeout waiting for echo")
+                    return result
+                mgr = self.serial_mgr.sync
+                parsed = mgr.parse_packet(pkt)
+                if not parsed:
+                    result["message"] = "Invalid packet received"
+                    result["errors"].append("Packet parse failed")
+                    return result
+                result["success"] = True
+                result["parameters"] = mgr.decode_params(parsed["data"])
+                result["message"] = "Successfully downloaded parameters from pacemaker"
+            except Exception as e:
+                result["message"] = "Download error: {}".format(str(e))
+                result["errors"].append(str(e))
+            return result
+
+    async def program_and_verify(self, mode, parameters, tolerances: Optional[Dict[str, int]] = None,
+                                 timeout: float = 2.0) -> Dict[str, Any]:
+        """
+        Program and read back in one transaction: the K_PPARAMS frame and a K_ECHO
+        request go out in a single write, then the echoed block is compared field
+        by field with what _prepare_firmware_params() produced.
+
+        result["diff"] maps each firmware key to sent / received / delta /
+        tolerance / ok; result["mismatches"] lists the keys outside tolerance and
+        result["verified"] is the overall pass/fail.
+        """
+        result = {
+            "success": False,
+            "verified": False,
+            "message": "",
+            "errors": [],
+            "diff": {},
+            "mismatches": [],
+            "parameters": {},
+            "latency_ms": None,
+        }
+        if not self.is_connected:
+            result["message"] = "Device not connected"
+            result["errors"].append("Device not connected")
+            return result
+
+        tol = dict(VERIFY_TOLERANCES)
+        tol.update(tolerances or {})
+        mgr = self.serial_mgr.sync
+        async with self._exchange:
+            try:
+                fw_params = self._prepare_firmware_params(mode, parameters or {})
+                request = mgr.build_data_packet(mode=mode, params=fw_params) + COMMAND_FRAMES[K_ECHO]
+
+                self.serial_mgr.discard_replies()
+                t0 = time.perf_counter()
+                if not await self.serial_mgr.send(request):
+                    result["message"] = "Parameter transmission failed"
+                    result["errors"].append("Data send failed")
+                    return result
+
+                # A K_PPARAMS acknowledgement may arrive first; the verdict comes from K_ECHO
+                pkt = await self._wait_for((K_ECHO,), timeout)
+                parsed = mgr.parse_packet(pkt) if pkt else None
+                result["latency_ms"] = round((time.perf_counter() - t0) * 1000.0, 3)
+                if not parsed:
+                    result["message"] = "No echo from pacemaker"
+                    result["errors"].append("Timeout waiting for echo")
+                    return result
+                echo = parsed["data"]
+
+                received = mgr.decode_raw_params(echo)
+                for key in PARAM_KEYS:
+                    sent = fw_params[key]
+                    got = received[key]
+                    delta = got - sent
+                    ok = abs(delta) <= tol.get(key, 0)
+                    result["diff"][key] = {
+                        "sent": sent, "received": got, "delta": delta,
+                        "tolerance": tol.get(key, 0), "ok": ok,
+                    }
+                    if not ok:
+                        result["mismatches"].append(key)
+
+                result["success"] = True
+                result["parameters"] = mgr.decode_params(echo)
+                result["verified"] = not result["mismatches"]
+                if result["verified"]:
+                    result["message"] = "Parameters programmed and verified"
+                else:
+                    result["message"] = "Verification failed: " + ", ".join(result["mismatches"])
+            except Exception as e:
+                result["message"] = "Program/verify error: {}".format(str(e))
+                result["errors"].append(str(e))
+            return result
+
+    async def _wait_for_link(self, link, poll: float = 0.05) -> bool:
+        """Wait out a ConnectionManager reconnect; False once it stops trying (detached / gave up)."""
+        while not self.get_connection_status():
+            if not link.reconnecting:
+                return False
+            await asyncio.sleep(poll)
+        return True
+
+    async def egram(self, sample_rate: float = 200.0, batch_wait: float = 0.05,
+                    link=None, start_time: float = 0.0) -> AsyncIterator[np.ndarray]:
+        """
+        Async iterator of (n, 3) [t, atrial, ventricular] batches, like
+        PacemakerEgramSource.stream(): t starts at start_time, and with a
+        ConnectionManager as link a dropped connection is waited out and the
+        stream restarted, the gap added to t. K_ESTOP is sent when the iteration
+        ends (break, aclose() or cancellation).
+        """
+        import numpy as np
+
+        mgr = self.serial_mgr
+        if not self.get_connection_status():
+            return
+        if not await mgr.send(COMMAND_FRAMES[K_EGRAM]):
+            return
+        t = start_time
+        try:
+            while True:
+                if not self.get_connection_status():
+                    if link is None:
+                        break
+                    lost_at = time.monotonic()
+                    if not await self._wait_for_link(link):
+                        break
+                    t += time.monotonic() - lost_at
+                    await mgr.send(COMMAND_FRAMES[K_EGRAM])
+                    continue
+                frames = await mgr.read_frames(batch_wait)
+                if not frames:
+                    continue
+                amps = SerialManager.decode_egram_batch(frames)
+                n = len(amps)
+                if not n:
+                    continue
+                batch = np.empty((n, 3), dtype=np.float64)
+                batch[:, 0] = t + np.arange(n) / sample_rate
+                batch[:, 1:] = amps
+                t += n / sample_rate
+                yield batch
+        finally:
+            if self.get_connection_status():
+                await mgr.send(COMMAND_FRAMES[K_ESTOP])
+
+class TkAsyncBridge:
+    """
+    Lets Tk code use the async API without blocking mainloop.
+
+    submit() schedules a coroutine on io_loop() and the completion callback is
+    delivered back on the Tk thread (Tk is not thread-safe) by polling a queue
+    with after().
+
+        bridge = TkAsyncBridge(root)
+        bridge.submit(comm.core.upload_parameters(mode, params), on_done=show_result)
+    """
+
+    def __init__(self, tk_root, poll_ms: int = 20) -> None:
+        self.tk_root = tk_root
+        self.poll_ms = poll_ms
+        self.loop = io_loop()
+        self._done: "queue.Queue" = queue.Queue()
+        self._after_id = None
+        self._poll()
+
+    def submit(self, coro, on_done: Optional[Callable[[Any], None]] = None,
+               on_error: Optional[Callable[[BaseException], None]] = None) -> concurrent.futures.Future:
+        fut = asyncio.run_coroutine_threadsafe(coro, self.loop)
+        fut.add_done_callback(lambda f: self._done.put((f, on_done, on_error)))
+        return fut
+
+    def call(self, coro, timeout: Optional[float] = None) -> Any:
+        """Blocking convenience for scripts: run coro on the I/O loop and wait."""
+        return run_blocking(coro, timeout)
+
+    def _poll(self) -> None:
+        # Re-arm first, so a callback that raises cannot stop later deliveries
+        self._after_id = self.tk_root.after(self.poll_ms, self._poll)
+        while True:
+            try:
+                fut, on_done, on_error = self._done.get_nowait()
+            except queue.Empty:
+                break
+            if fut.cancelled():
+                continue
+            try:
+                exc = fut.exception()
+                if exc is not None:
+                    if on_error:
+                        on_error(exc)
+                elif on_done:
+                    on_done(fut.result())
+            except Exception as e:
+                print(f"[TkAsyncBridge] Callback failed: {e!r}")
+
+    def close(self) -> None:
+        """Stop delivering callbacks; the shared I/O loop keeps serving other links."""
+        if self._after_id is not None:
+            try:
+                self.tk_root.after_cancel(self._after_id)
+            except Exception:
+                pass
+            self._after_id = None
@@ -0,0 +1,253 @@
+# This file keeps the pacemaker link up in the background: port hot-plug watching and automatic reconnect.
+from __future__ import annotations
+from typing import Any, Callable, Dict, List, Optional, Tuple
+import queue
+import threading
+import time
+
+try:
+    from .Serial_Manager import SerialManager
+    from .auth import get_last_connected_device, get_device_port
+except ImportError:
+    from modules.Serial_Manager import SerialManager
+    from modules.auth import get_last_connected_device, get_device_port
+
+class ConnectionManager:
+    """
+    Watches the serial ports and supervises one PacemakerCommunication.
+
+    A watcher thread rescans the port list every poll_interval seconds and
+    posts ("ports", [...]) whenever it changes. Once a connected comm is
+    attach()ed, a drop (I/O on it fails, or its port vanishes from a list it
+    was in while connected) posts ("lost", ...) and the manager reconnects
+    the *same* comm object to the last device recorded in
+    Pacemaker_device_name.json: first at once, then with exponential backoff (backoff_initial, x backoff_factor, capped
+    at backoff_max), and immediately whenever that port reappears. Success
+    posts ("reconnected", report) with the outage duration and the time the
+    reconnect itself took; windows holding the comm keep working, and an
+    egram stream given this manager as its link resumes (see
+    EGdiagram.PacemakerEgramSource). max_outage (seconds) gives up with
+    ("gave_up", ...); None retries until detach().
+
+    Events go to the thread-safe `events` queue, so Tk code can drain it
+    from an after() loop; nothing here touches Tk.
+    """
+
+    def __init__(self, poll_interval: float = 0.5, backoff_initial: float = 0.25,
+                 backoff_factor: float = 2.0, backoff_max: float = 8.0,
+                 max_outage: Optional[float] = None,
+                 list_ports: Callable[[], List[str]] = SerialManager.list_available_ports) -> None:
+        self.poll_interval = poll_interval
+        self.backoff_initial = backoff_initial
+        self.backoff_factor = backoff_factor
+        self.backoff_max = backoff_max
+        self.max_outage = max_outage
+        self.list_ports = list_ports
+        self.events: "queue.SimpleQueue[Tuple[str, Dict[str, Any]]]" = queue.SimpleQueue()
+        self.ports: List[str] = []
+        self.comm = None
+        self.device_name: Optional[str] = None
+        self.port: Optional[str] = None  # where reconnects go
+        self.history: List[Dict[str, Any]] = []  # one report per completed reconnect
+        self._lock = threading.RLock()  # guards the fields below; never held during port I/O
+        self._wake = threading.Event()
+        self._up = threading.Event()
+        self._running = False
+        self._thread: Optional[threading.Thread] = None
+        # outage state, owned by the watcher thread
+        self._lost_at: Optional[float] = None
+        self._next_try = 0.0
+        self._delay = backoff_initial
+        self._attempts = 0
+        # Whether enumeration lists the port while it is up; only then does the
+        # port vanishing from the list count as a drop (ptys, many USB-serial
+        # adapters in containers and URL transports never show up in comports)
+        self._was_listed: Optional[bool] = None
+        self._epoch = 0  # bumped by attach()/detach(), so a reconnect in flight can tell
+
+    # ---------- lifecycle ----------
+    def start(self) -> None:
+        if self._running:
+            return
+        self._running = True
+        self._thread = threading.Thread(target=self._run, name="connection-manager", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self.detach()
+        self._running = False
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join(timeout=2.0)
+            self._thread = None
+
+    def attach(self, comm) -> None:
+        """Supervise a connected PacemakerCommunication (call after its connect() succeeded)."""
+        with self._lock:
+            self.comm = comm
+            self.device_name = get_last_connected_device()
+            self.port = comm.serial_mgr.port
+            self._lost_at = None
+            self._was_listed = None  # decided by the watcher's next scan
+            self._epoch += 1
+            self._up.set()
+        self._wake.set()
+
+    def detach(self) -> None:
+        """Stop supervising, e.g. before a user-initiated disconnect; no reconnect follows."""
+        with self._lock:
+            self.comm = None
+            self._lost_at = None
+            self._epoch += 1
+            self._up.clear()
+        self._wake.set()
+
+    # ---------- state ----------
+    @property
+    def reconnecting(self) -> bool:
+        """A supervised link is down (including a drop the watcher has not picked up yet)."""
+        comm = self.comm
+        return comm is not None and (self._lost_at is not None or not comm.get_connection_status())
+
+    @property
+    def outage_s(self) -> float:
+        """Seconds since the current drop, 0 while connected."""
+        lost = self._lost_at
+        return time.monotonic() - lost if lost is not None else 0.0
+
+    def wait_connected(self, timeout: Optional[float] = None) -> bool:
+        """True once the supervised link is up; False on timeout or when no link is supervised."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            remaining = None if deadline is None else max(0.0, deadline - time.monotonic())
+            if not self._up.wait(remaining):
+                return False
+            comm = self.comm
+            if comm is None:
+                return False
+            if comm.get_connection_status():
+                return True
+            # Dropped, but the watcher has not seen it yet: have it look now
+            self._wake.set()
+            if deadline is not None and time.monotonic() >= deadline:
+                return False
+            time.sleep(0.02)
+
+    # ---------- watcher ----------
+    def _post(self, kind: str, info: Dict[str, Any]) -> None:
+        self.events.put((kind, info))
+
+    def _scan(self) -> List[str]:
+        """Current port list; returns the ports that appeared since the last scan."""
+        try:
+            ports = list(self.list_ports())
+        except Exception:
+            return []
+        appeared = [p for p in ports if p not in self.ports]
+        if ports != self.ports:
+            self.ports = ports
+            self._post("ports", {"ports": ports})
+        return appeared
+
+    def _run(self) -> None:
+        self._scan()
+        while self._running:
+            appeared = self._scan()
+            self._supervise(appeared)
+            with self._lock:
+                wait = self.poll_interval
+                if self._lost_at is not None:
+                    wait = min(wait, max(0.0, self._next_try - time.monotonic()))
+            self._wake.wait(wait)
+            self._wake.clear()
+
+    def _listed(self, port: str) -> Optional[bool]:
+        """Whether port is in the last scan; None for ports a scan cannot see (tcp://, loop://, ...)."""
+        if "://" in str(port):
+            return None
+        return port in self.ports
+
+    def _supervise(self, appeared: List[str]) -> None:
+        """
+        One watcher step. Decisions are made under self._lock; the port itself
+        (disconnect / connect, which can block) is only touched outside it, so
+        attach() / detach() from the Tk thread never wait on the device.
+        """
+        with self._lock:
+            comm, epoch = self.comm, self._epoch
+            if comm is None:
+                return
+            if self._was_listed is None:
+                self._was_listed = self._listed(self.port) is True
+            vanished = self._was_listed and self._listed(self.port) is False
+            dropped = self._lost_at is None and (vanished or not comm.get_connection_status())
+        if dropped:
+            # Close the stale handle now, so the OS can give the device back its old name
+            comm.disconnect()
+            with self._lock:
+                if self._epoch != epoch:
+                    return  # detached meanwhile
+                now = time.monotonic()
+                # Reconnect to the last device on record, wherever the device file says it lives
+                self.port = get_device_port(self.device_name) or self.port
+                self._lost_at = now
+                self._next_try = now
+                self._delay = self.backoff_initial
+                self._attempts = 0
+                self._up.clear()
+                print(f"[ConnectionManager] Lost {self.device_name or self.port}; reconnecting")
+                self._post("lost", {"port": self.port, "device": self.device_name})
+
+        with self._lock:
+            if self._epoch != epoch or self._lost_at is None:
+                return
+            now = time.monotonic()
+            port = self.port
+            if self.max_outage is not None and now - self._lost_at > self.max_outage:
+                print(f"[ConnectionManager] Gave up on {self.device_name or port} after {now - self._lost_at:.1f} s")
+                self._post("gave_up", {"port": port, "device": self.device_name,
+                                       "outage_s": now - self._lost_at, "attempts": self._attempts})
+                self.comm = None
+                self._lost_at = None
+                return
+            if port in appeared:
+                self._next_try = now  # hot-plugged back in: don't sit out the backoff
+            if now < self._next_try:
+                return
+            if self._was_listed and self._listed(port) is False:
+                # Not plugged in: nothing to try yet; the scan will notice it coming back
+                self._next_try = now + self._delay
+                self._delay = min(self._delay * self.backoff_factor, self.backoff_max)
+                return
+            self._attempts += 1
+
+        t0 = time.monotonic()
+        comm.serial_mgr.config(port=port)
+        ok = comm.connect()
+        done = time.monotonic()
+
+        with self._lock:
+            if self._epoch != epoch:
+                # detach() ran while we were connecting: leave the port the way the
+                # user's own connect / disconnect left it, unless nobody owns it now
+                if ok and self.comm is not comm:
+                    comm.disconnect()
+                return
+            if not ok:
+                self._next_try = done + self._delay
+                self._delay = min(self._delay * self.backoff_factor, self.backoff_max)
+                return
+            report = {
+                "port": port,
+                "device": self.device_name,
+                "outage_s": round(done - self._lost_at, 3),
+                "reconnect_ms": round((done - t0) * 1000.0, 1),
+                "attempts": self._attempts,
+            }
+            self.history.append(report)
+            self._lost_at = None
+            self._was_listed = self._listed(port) is True
+            self._up.set()
+            print(f"[ConnectionManager] Reconnected {self.device_name or port} in {report['reconnect_ms']} ms "
+                  f"after a {report['outage_s']} s outage ({report['attempts']} attempt(s))")
+            self._post("reconnected", report)
@@ -0,0 +1,316 @@
+# This file implements a virtual pacemaker that speaks the DCM serial protocol, for load testing without a K64F.
+from __future__ import annotations
+from typing import Callable, Optional, Dict, Any
+import argparse
+import math
+import os
+import random
+import select
+import struct
+import threading
+import time
+
+try:
+    from .Serial_Manager import (SerialManager, PacketFramer, FRAME_LEN, N_DATA,
+                                 K_ECHO, K_PPARAMS, K_EGRAM, K_ESTOP)
+    from .Param_Codec import PARAM_CODEC
+    from .Transport import LoopbackTransport
+except ImportError:
+    from modules.Serial_Manager import (SerialManager, PacketFramer, FRAME_LEN, N_DATA,
+                                        K_ECHO, K_PPARAMS, K_EGRAM, K_ESTOP)
+    from modules.Param_Codec import PARAM_CODEC
+    from modules.Transport import LoopbackTransport
+
+# Factory settings stored before the DCM programs anything (firmware units);
+# fields not listed take the codec defaults
+FACTORY_PARAMS = {"p_pacingMode": 0, "p_aSens": 250, "p_vSens": 250}
+
+def max_frame_rate(baudrate: int) -> float:
+    """Frames per second the UART can carry (8N1: 10 bits per byte)."""
+    return baudrate / (10.0 * FRAME_LEN)
+
+class PacemakerSimulator:
+    """
+    Protocol core of the virtual device, independent of the byte transport.
+
+    Bytes written by the DCM go into feed(); replies and egram frames leave via
+    the `write` callable. K_PPARAMS stores the 30-byte parameter block (and, with
+    ack_params, answers with it), K_ECHO returns it, K_EGRAM / K_ESTOP toggle the
+    synthetic egram stream produced by egram_frame().
+    """
+
+    def __init__(self, write: Callable[[bytes], Any], ack_params: bool = True) -> None:
+        self.write = write
+        self.ack_params = ack_params
+        self.framer = PacketFramer()
+        self.params = bytearray(PARAM_CODEC.pack(FACTORY_PARAMS))
+        self.streaming = False
+        self._packer = SerialManager()  # only used for build_packet(); never connected
+        self._rng = random.Random(0)
+        self._t = 0.0
+        self.counters: Dict[str, int] = {
+            "rx_frames": 0, "params_written": 0, "echoes": 0, "egram_frames": 0,
+        }
+
+    def feed(self, data: bytes) -> None:
+        for frame in self.framer.feed(data):
+            self.handle_frame(frame)
+
+    def handle_frame(self, frame: bytes) -> None:
+        self.counters["rx_frames"] += 1
+        fn = frame[2]
+        if fn == K_PPARAMS:
+            self.params[:] = frame[4:4 + N_DATA]
+            self.counters["params_written"] += 1
+            if self.ack_params:
+                self.write(self._packer.build_packet(K_PPARAMS, bytes(self.params)))
+        elif fn == K_ECHO:
+            self.counters["echoes"] += 1
+            self.write(self._packer.build_packet(K_ECHO, bytes(self.params)))
+        elif fn == K_EGRAM:
+            self.streaming = True
+        elif fn == K_ESTOP:
+            self.streaming = False
+
+    def decoded_params(self) -> Dict[str, Any]:
+        return SerialManager.decode_params(bytes(self.params))
+
+    def egram_frame(self, dt: float) -> bytes:
+        """
+        Next synthetic egram sample, dt seconds after the previous one: paced
+        atrial and (150 ms later) ventricular spikes at the stored LRL, with the
+        programmed amplitudes and pulse widths, on a slightly noisy baseline.
+        """
+        p = PARAM_CODEC.unpack_raw(bytes(self.params))
+        lrl, a_pw, v_pw = p["p_LRL"], p["p_aPaceWidth"], p["p_vPaceWidth"]
+        a_amp, v_amp = p["p_aPaceAmp"], p["p_vPaceAmp"]
+        self._t += dt
+        period = 60.0 / max(lrl, 1)
+        phase = math.fmod(self._t, period)
+        atr = self._rng.gauss(0.0, 0.02)
+        ven = self._rng.gauss(0.0, 0.02)
+        if phase < max(a_pw, 1) / 1000.0 + dt:
+            atr += a_amp / 100.0
+        if 0.150 <= phase < 0.150 + max(v_pw, 1) / 1000.0 + dt:
+            ven += v_amp / 100.0
+        # Wire format (see SerialManager.decode_egram): raw = (5.0 - volts) * 100 at data[12:16]
+        data = bytearray(N_DATA)
+        struct.pack_into("<HH", data, 12, _to_raw(atr), _to_raw(ven))
+        self.counters["egram_frames"] += 1
+        return self._packer.build_packet(K_EGRAM, bytes(data))
+
+def _to_raw(volts: float) -> int:
+    return max(0, min(0xFFFF, int(round((5.0 - volts) * 100.0))))
+
+class PtySimulator:
+    """
+    Runs a PacemakerSimulator behind a pseudo-terminal (Linux/macOS).
+
+    start() returns the slave device path; open it like a COM port, e.g.
+    PacemakerCommunication(port=sim.port). Egram frames are paced at egram_rate
+    (clamped to what the nominal baudrate can carry); frames that do not fit
+    into the pty buffer because nobody is reading are dropped, like a UART overrun.
+    Frames are dropped whole: a frame the pty took only part of is finished
+    before anything else is written, so the stream stays frame-aligned.
+    """
+
+    def __init__(self, egram_rate: float = 200.0, baudrate: int = 115200,
+                 ack_params: bool = True) -> None:
+        self.egram_rate = min(float(egram_rate), max_frame_rate(baudrate))
+        self.baudrate = baudrate
+        self.core = PacemakerSimulator(self._write, ack_params=ack_params)
+        self.port: Optional[str] = None
+        self.dropped_frames = 0
+        self._tail = bytearray()  # rest of a frame the pty only took part of
+        self._master: Optional[int] = None
+        self._slave: Optional[int] = None
+        self._thread: Optional[threading.Thread] = None
+        self._running = False
+
+    def __enter__(self) -> "PtySimulator":
+        self.start()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.stop()
+
+    def start(self) -> str:
+        import pty, tty
+        self._master, self._slave = pty.openpty()
+        tty.setraw(self._slave)  # no echo / line editing before the DCM opens it
+        os.set_blocking(self._master, False)
+        self.port = os.ttyname(self._slave)
+        self._running = True
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+        return self.port
+
+    def stop(self) -> None:
+        self._running = False
+        if self._thread:
+            self._thread.join(timeout=1.0)
+            self._thread = None
+        for fd in (self._master, self._slave):
+            if fd is not None:
+                try:
+                    os.close(fd)
+                except OSError:
+                    pass
+        self._master = self._slave = None
+
+    def _send(self, data) -> int:
+        try:
+            return os.write(self._master, data)
+        except (BlockingIOError, OSError):
+            return 0
+
+    def _write(self, data: bytes) -> bool:
+        """Write whole frames; the ones that do not fit are counted in dropped_frames."""
+        if self._tail:
+            del self._tail[:self._send(self._tail)]
+        frames = -(-len(data) // FRAME_LEN)
+        if self._tail:
+            self.dropped_frames += frames
+            return False
+        n = self._send(data)
+        if n == len(data):
+            return True
+        done, part = divmod(n, FRAME_LEN)
+        if part:
+            # Started on the wire: it has to be finished, not dropped
+            self._tail += data[n:(done + 1) * FRAME_LEN]
+            done += 1
+        self.dropped_frames += frames - done
+        return False
+
+    def _run(self) -> None:
+        period = 1.0 / self.egram_rate if self.egram_rate > 0 else None
+        next_tick = time.monotonic()
+        while self._running:
+            if self.core.streaming and period:
+                timeout = max(0.0, next_tick - time.monotonic())
+            else:
+                timeout = 0.05
+            try:
+                ready, writable, _ = select.select([self._master], [self._master] if self._tail else [],
+                                                   [], timeout)
+            except (OSError, ValueError):
+                break
+            if writable and self._tail:
+                del self._tail[:self._send(self._tail)]
+            if ready:
+                try:
+                    data = os.read(self._master, 4096)
+                except BlockingIOError:
+                    data = b""
+                except OSError:
+                    break
+                if data:
+                    was_streaming = self.core.streaming
+                    self.core.feed(data)
+                    if self.core.streaming and not was_streaming:
+                        next_tick = time.monotonic()
+            if not (self.core.streaming and period):
+                continue
+            now = time.monotonic()
+            # Catch up on every tick that is due, in one write
+            due = int((now - next_tick) / period) + 1 if now >= next_tick else 0
+            if due:
+                block = b"".join(self.core.egram_frame(period) for _ in range(due))
+                self._write(block)
+                next_tick += due * period
+
+class LoopbackSimulator:
+    """
+    Runs a PacemakerSimulator on an in-memory LoopbackTransport: no pty, no OS
+    buffers, no baud rate, so the protocol code is measured at memory speed.
+
+    Pass sim.transport to PacemakerCommunication(transport=...). Commands are
+    answered synchronously inside the DCM's write(); while an egram stream is
+    on, a thread emits frames at egram_rate (None or 0: as fast as possible,
+    which only makes sense for a consumer that keeps up). The thread ends with
+    the stream or when the DCM closes the transport.
+    """
+
+    def __init__(self, egram_rate: Optional[float] = 200.0, ack_params: bool = True,
+                 timeout: Optional[float] = 1.0, batch: int = 64) -> None:
+        self.egram_rate = egram_rate
+        self.batch = batch
+        self.transport = LoopbackTransport(on_write=self._on_dcm_write, timeout=timeout)
+        self.core = PacemakerSimulator(self.transport._deliver, ack_params=ack_params)
+        self.port = self.transport.port
+        self._lock = threading.Lock()  # core is fed from the DCM thread and ticked from ours
+        self._thread: Optional[threading.Thread] = None
+
+    def __enter__(self) -> "LoopbackSimulator":
+        self.start()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.stop()
+
+    def start(self) -> str:
+        """Optional: connecting the DCM opens the transport too."""
+        self.transport.open()
+        return self.port
+
+    def stop(self) -> None:
+        self.transport.close()
+        if self._thread is not None:
+            self._thread.join(timeout=1.0)
+            self._thread = None
+
+    def _on_dcm_write(self, data: bytes) -> None:
+        with self._lock:
+            was_streaming = self.core.streaming
+            self.core.feed(data)
+            started = self.core.streaming and not was_streaming
+        if started and (self._thread is None or not self._thread.is_alive()):
+            self._thread = threading.Thread(target=self._run, daemon=True)
+            self._thread.start()
+
+    def _streaming(self) -> bool:
+        return self.core.streaming and self.transport.is_open
+
+    def _run(self) -> None:
+        rate = self.egram_rate
+        if not rate:
+            while self._streaming():
+                with self._lock:
+                    block = b"".join(self.core.egram_frame(0.005) for _ in range(self.batch))
+                self.transport._deliver(block)
+            return
+        period = 1.0 / rate
+        next_tick = time.monotonic()
+        while self._streaming():
+            now = time.monotonic()
+            due = int((now - next_tick) / period) + 1 if now >= next_tick else 0
+            if due:
+                with self._lock:
+                    block = b"".join(self.core.egram_frame(period) for _ in range(due))
+                self.transport._deliver(block)
+                next_tick += due * period
+            time.sleep(max(0.0, min(next_tick - time.monotonic(), 0.05)))
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Virtual pacemaker on a pseudo-terminal")
+    parser.add_argument("--rate", type=float, default=200.0, help="egram frames per second")
+    parser.add_argument("--baudrate", type=int, default=115200, help="nominal UART speed (caps --rate)")
+    parser.add_argument("--no-ack", action="store_true", help="do not answer K_PPARAMS with an echo")
+    args = parser.parse_args(argv)
+
+    sim = PtySimulator(egram_rate=args.rate, baudrate=args.baudrate, ack_params=not args.no_ack)
+    port = sim.start()
+    print(f"Virtual pacemaker on {port} (egram {sim.egram_rate:.0f} Hz). Ctrl-C to stop.", flush=True)
+    try:
+        while True:
+            time.sleep(1.0)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        sim.stop()
+        print(f"Counters: {sim.core.counters}, dropped egram frames: {sim.dropped_frames}")
+    return 0
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -1,8 +1,9 @@
 # This file implements the EG diagram drawing logic using Matplotlib.
-import time, threading, queue, struct
+import os, time, threading, queue, struct, math
 import tkinter as tk
 from tkinter import ttk, messagebox
 from collections import deque
+import numpy as np
 
 # --- Matplotlib imports ---
 import matplotlib
@@ -10,75 +11,326 @@ matplotlib.use("TkAgg")
 from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
 from matplotlib.figure import Figure
 
+try:
+    from .Egram_Recorder import EgramRecorder, FILE_SUFFIX
+    from .Egram_Replay import EgramReplaySource, SPEEDS, parse_speed
+except ImportError:
+    from modules.Egram_Recorder import EgramRecorder, FILE_SUFFIX
+    from modules.Egram_Replay import EgramReplaySource, SPEEDS, parse_speed
+
+def minmax_decimate(xs, ys, n_buckets):
+    """
+    Min/max envelope: split the samples into n_buckets equal runs and keep each
+    run's minimum and maximum (2 points per bucket), so narrow pacing spikes stay
+    visible however far the view is zoomed out. Short inputs are returned as-is.
+    """
+    n = len(xs)
+    if n_buckets <= 0 or n <= 2 * n_buckets:
+        return xs, ys
+    starts = (np.arange(n_buckets) * n) // n_buckets
+    ends = np.append(starts[1:], n) - 1
+    out_x = np.empty(2 * n_buckets, dtype=xs.dtype)
+    out_y = np.empty(2 * n_buckets, dtype=ys.dtype)
+    out_x[0::2] = xs[starts]
+    out_x[1::2] = xs[ends]
+    out_y[0::2] = np.minimum.reduceat(ys, starts)
+    out_y[1::2] = np.maximum.reduceat(ys, starts)
+    return out_x, out_y
+
 class EgramModel:
     """Stores data buffers for Atrial and Ventricular signals."""
+    CHANNELS = ("Atrial", "Ventricular")
+
     def __init__(self, time_span_s=10.0, sample_rate=200):
         self.time_span_s = time_span_s
         self.sample_rate = sample_rate
         self.gain =1.0
         # Buffer holds enough data for smooth scrolling (approx 8x window width)
-        maxlen = int(self.time_span_s * self.sample_rate * 8) + 1
-        
-        # Only Atrial and Ventricular buffers needed now
-        self.buffers = {
-            "Atrial": deque(maxlen=maxlen),
-            "Ventricular": deque(maxlen=maxlen)
-        }
+        self.capacity = int(self.time_span_s * self.sample_rate * 8) + 1
+
+        # Preallocated ring buffer: one float64 time column plus one float32 column
+        # per channel. Every sample is stored twice (slot i and i + capacity), so the
+        # newest samples are always one contiguous slice and reads are plain views.
+        cap = self.capacity
+        self._t = np.zeros(2 * cap, dtype=np.float64)
+        self._y = np.zeros((len(self.CHANNELS), 2 * cap), dtype=np.float32)
+        self._index = {name: i for i, name in enumerate(self.CHANNELS)}
+        self._head = 0   # next slot to write, in [0, capacity)
+        self._size = 0
+        self.version = 0  # bumped on every change, lets the controller skip idle redraws
+
+    def __len__(self):
+        return self._size
+
+    def clear(self):
+        self._head = 0
+        self._size = 0
+        self.version += 1
 
     def append_batch(self, batch):
-        """Append a batch of (time, atrial_val, vent_val) tuples."""
-        for t, atrial, ventricular in batch:
-            self.buffers["Atrial"].append((t, atrial))
-            self.buffers["Ventricular"].append((t, ventricular))
+        """Append a batch of (time, atrial_val, vent_val) rows (tuples or an (n, 3) array)."""
+        arr = np.asarray(batch, dtype=np.float64)
+        if arr.size == 0:
+            return
+        arr = arr.reshape(-1, 1 + len(self.CHANNELS))
+        cap = self.capacity
+        if len(arr) > cap:
+            arr = arr[-cap:]
+        n = len(arr)
+        # At most two slices: up to the end of the ring, then wrapped to the front
+        first = min(n, cap - self._head)
+        for src, dst in ((arr[:first], self._head), (arr[first:], 0)):
+            k = len(src)
+            if not k:
+                continue
+            for off in (dst, dst + cap):
+                self._t[off:off + k] = src[:, 0]
+                self._y[:, off:off + k] = src[:, 1:].T
+        self._head = (self._head + n) % cap
+        self._size = min(self._size + n, cap)
+        self.version += 1
+
+    def _span(self):
+        end = self._head + self.capacity
+        return end - self._size, end
+
+    def times(self):
+        """Zero-copy view of buffered timestamps, oldest first."""
+        start, end = self._span()
+        return self._t[start:end]
+
+    def channel(self, name):
+        """Zero-copy view of one channel's samples, aligned with times()."""
+        start, end = self._span()
+        return self._y[self._index[name], start:end]
+
+    def index_range(self, t0, t1, margin=1):
+        """
+        Bisect the (monotonic) timestamps for the samples inside [t0, t1], widened
+        by `margin` samples on each side so lines run to the plot edges.
+        Returns (i0, i1) for slicing times() / channel().
+        """
+        ts = self.times()
+        i0 = int(np.searchsorted(ts, t0, side="left")) - margin
+        i1 = int(np.searchsorted(ts, t1, side="right")) + margin
+        return max(i0, 0), min(i1, len(ts))
+
+class BatchQueue:
+    """
+    Bounded hand-off between the egram producer thread and the Tk thread.
+
+    When maxsize batches are waiting the overflow policy decides what happens:
+      - "drop_oldest": discard the oldest batch to make room (producer never waits)
+      - "coalesce":    merge the new batch into the newest queued one; queued
+                       samples are capped at max_samples, oldest dropped first
+      - "block":       the producer waits until the UI thread catches up
+    Counters in self.stats show what was lost or delayed.
+    """
+    POLICIES = ("drop_oldest", "coalesce", "block")
+
+    def __init__(self, maxsize=64, policy="drop_oldest", max_samples=None):
+        if policy not in self.POLICIES:
+            raise ValueError(f"unknown overflow policy: {policy}")
+        self.maxsize = maxsize
+        self.policy = policy
+        self.max_samples = max_samples
+        self._items = deque()
+        self._cond = threading.Condition()
+        self._closed = False
+        self.stats = {
+            "dropped_batches": 0,
+            "dropped_samples": 0,
+            "coalesced": 0,
+            "blocked_s": 0.0,
+            "high_water": 0,
+        }
+
+    def qsize(self):
+        return len(self._items)
+
+    def open(self):
+        with self._cond:
+            self._closed = False
+
+    def close(self):
+        """Wake a blocked producer; further put() calls return False."""
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+
+    def put(self, batch):
+        """Queue a batch, applying the overflow policy. False once closed."""
+        with self._cond:
+            if self._closed:
+                return False
+            if len(self._items) >= self.maxsize:
+                if self.policy == "block":
+                    t0 = time.perf_counter()
+                    while len(self._items) >= self.maxsize and not self._closed:
+                        self._cond.wait(0.1)
+                    self.stats["blocked_s"] += time.perf_counter() - t0
+                    if self._closed:
+                        return False
+                elif self.policy == "coalesce":
+                    self._coalesce(batch)
+                    return True
+                else:
+                    old = self._items.popleft()
+                    self.stats["dropped_batches"] += 1
+                    self.stats["dropped_samples"] += len(old)
+            self._items.append(batch)
+            self.stats["high_water"] = max(self.stats["high_water"], len(self._items))
+            return True
+
+    def _coalesce(self, batch):
+        merged = np.concatenate([np.asarray(self._items.pop(), dtype=np.float64).reshape(-1, 3),
+                                 np.asarray(batch, dtype=np.float64).reshape(-1, 3)])
+        self.stats["coalesced"] += 1
+        if self.max_samples:
+            # Never hold more than the model could keep; older samples would be overwritten anyway
+            excess = sum(len(b) for b in self._items) + len(merged) - self.max_samples
+            while excess > 0 and self._items:
+                old = self._items.popleft()
+                excess -= len(old)
+                self.stats["dropped_batches"] += 1
+                self.stats["dropped_samples"] += len(old)
+            if excess > 0:
+                self.stats["dropped_samples"] += excess
+                merged = merged[excess:]
+        self._items.append(merged)
+
+    def get_nowait(self):
+        with self._cond:
+            if not self._items:
+                raise queue.Empty
+            batch = self._items.popleft()
+            self._cond.notify()
+            return batch
 
 class EgramController:
-    """Manages the data stream thread and UI refresh loop."""
-    def __init__(self, model, view, source, tk_root, refresh_ms=50):
+    """
+    Manages the data stream thread and UI refresh loop.
+
+    The loop only renders when the model received samples or the view asked
+    for a redraw, spends at most drain_budget_ms per tick moving batches from
+    the queue into the model (the rest waits for the next tick instead of
+    starving Tk), and stretches the tick interval between refresh_ms and
+    max_refresh_ms so rendering takes about 1/load_factor of the time.
+    """
+    def __init__(self, model, view, source, tk_root, refresh_ms=50,
+                 max_refresh_ms=250, drain_budget_ms=10.0, load_factor=3.0,
+                 queue_size=64, overflow="drop_oldest"):
         self.model = model
         self.view = view
         self.source = source
         self.tk_root = tk_root
         self.refresh_ms = refresh_ms
-        self.q = queue.Queue()
+        self.max_refresh_ms = max_refresh_ms
+        self.drain_budget_ms = drain_budget_ms
+        self.load_factor = load_factor
+        self.q = BatchQueue(queue_size, overflow, max_samples=getattr(model, "capacity", None))
+        self.recorder = None  # EgramRecorder fed from the producer thread, ahead of the queue
         self.running = False
         self.thread = None
+        self._interval_ms = refresh_ms
+        self._last_tick = None
+        self._rendered_version = None
+        self.stats = {
+            "frame_ms": 0.0,       # smoothed render time
+            "interval_ms": refresh_ms,
+            "frames": 0,
+            "idle_ticks": 0,       # ticks with nothing new to draw
+            "dropped_ticks": 0,    # ticks that could not run on schedule
+            "queue_depth": 0,
+        }
 
     def start(self):
         if self.running: return
         self.running = True
+        self.q.open()
         self.thread = threading.Thread(target=self._producer, daemon=True)
         self.thread.start()
         self._draw_loop()
 
     def stop(self):
         self.running = False
+        self.q.close()
 
     def _producer(self):
         # Fetch data from source and put into thread-safe queue
         for chunk in self.source.stream():
             if not self.running: break
-            self.q.put(chunk)
+            # Record before the overflow policy can drop anything
+            rec = self.recorder
+            if rec is not None: rec.write(chunk)
+            if not self.q.put(chunk): break
+
+    def _drain(self):
+        deadline = time.perf_counter() + self.drain_budget_ms / 1000.0
+        while time.perf_counter() < deadline:
+            try:
+                chunk = self.q.get_nowait()
+            except queue.Empty:
+                break
+            self.model.append_batch(chunk)
+
+    def _adapt(self, frame_ms):
+        st = self.stats
+        st["frame_ms"] = frame_ms if st["frames"] == 0 else 0.8 * st["frame_ms"] + 0.2 * frame_ms
+        st["frames"] += 1
+        self._interval_ms = min(self.max_refresh_ms,
+                                max(self.refresh_ms, st["frame_ms"] * self.load_factor))
+        st["interval_ms"] = self._interval_ms
 
     def _draw_loop(self):
         # Process queue and update view
         try:
-            while not self.q.empty():
-                self.model.append_batch(self.q.get_nowait())
-            
+            now = time.perf_counter()
+            if self._last_tick is not None:
+                slots = (now - self._last_tick) * 1000.0 / self._interval_ms
+                if slots >= 2:
+                    self.stats["dropped_ticks"] += int(slots) - 1
+            self._last_tick = now
+
+            self._drain()
+            self.stats["queue_depth"] = self.q.qsize()
+
             if self.running:
-                self.view.render(self.model)
-                self.tk_root.after(self.refresh_ms, self._draw_loop)
+                if self.model.version != self._rendered_version or self.view.needs_render:
+                    t0 = time.perf_counter()
+                    self.view.render(self.model)
+                    # Run the pending draw_idle now so the measured time includes Agg
+                    self.view.update_idletasks()
+                    self._rendered_version = self.model.version
+                    self._adapt((time.perf_counter() - t0) * 1000.0)
+                else:
+                    self.stats["idle_ticks"] += 1
+                self.tk_root.after(int(self._interval_ms), self._draw_loop)
         except Exception:
             pass
 
 class EgramView(tk.Frame):
-    """Matplotlib-based view for plotting signals."""
-    def __init__(self, parent, **kw):
+    """
+    Matplotlib-based view for plotting signals.
+
+    With blit=True only the two signal lines are redrawn each frame on top of a
+    cached background (axes, grid, legend, ticks); a full draw happens only when
+    the axis limits change. While following live data the x-range advances in
+    pages of blit_page * span so the limits, and thus the ticks, stay put
+    between page flips.
+    """
+    def __init__(self, parent, blit=False, **kw):
         super().__init__(parent, **kw)
+        self.blit = blit
+        self.blit_page = 0.25
+        self._background = None
+        self._bg_limits = None
         self.show = {"Atrial": True, "Ventricular": True}
         self.colors = {"Atrial": "red", "Ventricular": "green"}
         self.zoom = 1.0 
         self.pan_offset_s = 0.0
+        self.points_per_px = 2  # decimation budget per pixel column; 0 disables it
+        self.needs_render = True  # set when view settings change; cleared by render()
         self._drag_x = None
         self.figure = Figure(figsize=(5, 4), dpi=100)
         self.ax = self.figure.add_subplot(111)
@@ -97,6 +349,8 @@ class EgramView(tk.Frame):
         self.canvas_widget.bind("<B1-Motion>", self._on_drag)
         self.canvas_widget.bind("<ButtonRelease-1>", self._on_release)
         self.canvas_widget.bind("<Double-Button-1>", self._on_reset_pan)
+        self.canvas_agg.mpl_connect("draw_event", self._on_draw_event)
+        self.set_blit(blit)
 
     def _on_press(self, ev): self._drag_x = ev.x
     def _on_release(self, ev): self._drag_x = None
@@ -117,41 +371,88 @@ class EgramView(tk.Frame):
 
     def set_zoom(self, factor: float):
         self.zoom = factor
+        self.needs_render = True
+
+    def set_blit(self, enabled: bool):
+        """Switch between blitted line-only redraws and full draw_idle() redraws."""
+        self.blit = bool(enabled)
+        for line in self.lines.values():
+            line.set_animated(self.blit)
+        self._background = None
+        self._bg_limits = None
+        if hasattr(self, "_last_model"): self.render(self._last_model)
+
+    def _on_draw_event(self, event):
+        # A full draw (limit change, resize, expose) just finished: re-cache the
+        # static background and put the animated lines back on top of it.
+        if not self.blit:
+            return
+        self._background = self.canvas_agg.copy_from_bbox(self.figure.bbox)
+        for line in self.lines.values():
+            self.ax.draw_artist(line)
+
+    def _blit_xlim(self, t0, t1):
+        if self.pan_offset_s > 0 or self.blit_page <= 0:
+            return t0, t1
+        span = t1 - t0
+        step = span * self.blit_page
+        hi = math.ceil(t1 / step) * step
+        return hi - span, hi
+
+    def _point_budget(self):
+        """Bucket count for minmax_decimate(): one per horizontal pixel of the canvas."""
+        w = self.canvas_widget.winfo_width()
+        if w <= 1:  # not mapped yet; fall back to the figure's nominal size
+            w = int(self.figure.get_figwidth() * self.figure.dpi)
+        return w * self.points_per_px // 2
 
     def render(self, model):
+        self.needs_render = False
         self._last_model = model
         self._last_span = model.time_span_s
-        buf = model.buffers.get("Ventricular")
-        if len(buf) == 0:
-            buf = model.buffers.get("Atrial")
-        if len(buf) == 0:
+        ts = model.times()
+        if len(ts) == 0:
             return
-        t_end = buf[-1][0]
-        max_history = buf[-1][0] - buf[0][0]
+        t_end = ts[-1]
+        max_history = ts[-1] - ts[0]
         max_pan = max(0.0, max_history - model.time_span_s)
         self.pan_offset_s = min(self.pan_offset_s, max_pan)
         t1 = t_end - self.pan_offset_s
         t0 = t1 - model.time_span_s
+        if self.blit:
+            t0, t1 = self._blit_xlim(t0, t1)
+        # Only the visible slice goes to Agg, however long the history or pan offset
+        i0, i1 = model.index_range(t0, t1)
+        xs = ts[i0:i1]
+        budget = self._point_budget()
         for name, line in self.lines.items():
             if not self.show.get(name, True):
                 line.set_data([], [])
                 continue
-            data = model.buffers.get(name, [])
-            if not data:
-                line.set_data([], [])
-                continue
-            xs = [p[0] for p in data]
-            ys = [p[1] for p in data]
-            line.set_data(xs, ys)
-        self.ax.set_xlim(t0, t1)
+            line.set_data(*minmax_decimate(xs, model.channel(name)[i0:i1], budget))
         limit = (25.0 / model.gain) / self.zoom
-        self.ax.set_ylim(-limit, limit)
-        self.canvas_agg.draw_idle()
+        if not self.blit:
+            self.ax.set_xlim(t0, t1)
+            self.ax.set_ylim(-limit, limit)
+            self.canvas_agg.draw_idle()
+            return
+        limits = (t0, t1, limit)
+        if self._background is None or limits != self._bg_limits:
+            self._bg_limits = limits
+            self.ax.set_xlim(t0, t1)
+            self.ax.set_ylim(-limit, limit)
+            self.canvas_agg.draw()  # fires draw_event -> _on_draw_event
+            return
+        self.canvas_agg.restore_region(self._background)
+        for line in self.lines.values():
+            self.ax.draw_artist(line)
+        self.canvas_agg.blit(self.ax.bbox)
 
 class EgramWindow:
     """Main window container for the Egram graph and controls."""
-    def __init__(self, parent, comm_manager=None):
+    def __init__(self, parent, comm_manager=None, link=None):
         self.comm_manager = comm_manager
+        self.link = link  # ConnectionManager: the live stream survives drops it reconnects
         self.window = tk.Toplevel(parent)
         self.window.title("EG Diagram (Real-time)")
         self.window.geometry("1100x700")
@@ -169,6 +470,9 @@ class EgramWindow:
         self.clear_btn = ttk.Button(ctrl_frame, text="Clear", command=self.clear)
         self.clear_btn.pack(side=tk.LEFT, padx=5)
 
+        self.record_btn = ttk.Button(ctrl_frame, text="Record", command=self.toggle_recording)
+        self.record_btn.pack(side=tk.LEFT, padx=5)
+
         ttk.Label(ctrl_frame, text="Zoom:").pack(side=tk.LEFT, padx=(15, 5))
         for z in (0.5, 1, 2, 4):
             ttk.Button(ctrl_frame, text=f"x{z}", width=4,
@@ -184,12 +488,43 @@ class EgramWindow:
             ttk.Checkbutton(ctrl_frame, text=name, variable=var, 
                            command=self.update_display).pack(side=tk.LEFT, padx=5)
 
+        self.blit_var = tk.BooleanVar(value=False)
+        ttk.Checkbutton(ctrl_frame, text="Fast redraw", variable=self.blit_var,
+                        command=lambda: self.canvas.set_blit(self.blit_var.get())).pack(side=tk.LEFT, padx=(15, 5))
+
+        ttk.Label(ctrl_frame, text="| Overflow:").pack(side=tk.LEFT, padx=(15, 5))
+        self.overflow_var = tk.StringVar(value=BatchQueue.POLICIES[0])
+        ttk.Combobox(ctrl_frame, textvariable=self.overflow_var, values=BatchQueue.POLICIES,
+                     state="readonly", width=11).pack(side=tk.LEFT)
+
+        # Replay of recorded sessions
+        replay_frame = ttk.Frame(self.window)
+        replay_frame.pack(fill=tk.X, padx=10, pady=(0, 5))
+        ttk.Button(replay_frame, text="Open Recording", command=self.open_recording).pack(side=tk.LEFT, padx=5)
+        self.live_btn = ttk.Button(replay_frame, text="Live", command=self.go_live, state="disabled")
+        self.live_btn.pack(side=tk.LEFT, padx=5)
+        ttk.Label(replay_frame, text="Speed:").pack(side=tk.LEFT, padx=(15, 5))
+        self.speed_var = tk.StringVar(value=SPEEDS[0])
+        ttk.Combobox(replay_frame, textvariable=self.speed_var, values=SPEEDS,
+                     state="readonly", width=5).pack(side=tk.LEFT)
+        self.scrub = ttk.Scale(replay_frame, from_=0.0, to=1.0, orient=tk.HORIZONTAL, state="disabled")
+        self.scrub.pack(side=tk.LEFT, fill=tk.X, expand=True, padx=10)
+        self.scrub.bind("<ButtonRelease-1>", self._on_scrub)
+        self.pos_label = ttk.Label(replay_frame, text="", width=22)
+        self.pos_label.pack(side=tk.LEFT)
+
+        # Queue / render counters, refreshed by _check_conn_loop
+        self.stats_label = ttk.Label(self.window, text="", anchor="w")
+        self.stats_label.pack(side=tk.BOTTOM, fill=tk.X, padx=10, pady=(0, 5))
+
         # Graph Area
         self.canvas = EgramView(self.window)
         self.canvas.pack(padx=10, pady=10, fill=tk.BOTH, expand=True)
         
         self.model = EgramModel()
         self.controller = None
+        self.recorder = None
+        self.replay = None  # EgramReplaySource while reviewing a recording
         self._is_running = False
         self._update_ui_state()
         
@@ -201,15 +536,28 @@ class EgramWindow:
         self.start_btn.config(state=state)
         self.stop_btn.config(state=inv_state)
         self.clear_btn.config(state=state)
+        self.record_btn.config(state="disabled" if self.replay else inv_state,
+                               text="Stop Recording" if self.recorder else "Record")
 
     def start(self):
         if self._is_running: return
-        if not self.comm_manager or not self.comm_manager.get_connection_status():
+        if self.replay:
+            source = self.replay
+            source.speed = parse_speed(self.speed_var.get())
+        elif not self.comm_manager or not self.comm_manager.get_connection_status():
             messagebox.showerror("Error", "Pacemaker not connected.")
             return
-
-        source = PacemakerEgramSource(self.comm_manager)
-        self.controller = EgramController(self.model, self.canvas, source, self.window)
+        else:
+            source = PacemakerEgramSource(self.comm_manager, link=self.link)
+            # index_range() bisects, so timestamps must keep increasing: carry on
+            # after the samples still on screen instead of restarting at 0
+            if len(self.model):
+                source.time = float(self.model.times()[-1]) + 1.0 / source.sample_rate
+        overflow = self.overflow_var.get()
+        if self.replay and source.speed is None:
+            overflow = "block"  # "max" replay runs as fast as the view drains, without dropping
+        self.controller = EgramController(self.model, self.canvas, source, self.window,
+                                          overflow=overflow)
         self.controller.start()
         self._is_running = True
         self._update_ui_state()
@@ -218,18 +566,162 @@ class EgramWindow:
     def _check_conn_loop(self):
         # Stop automatically if connection drops
         if not self._is_running: return
-        if not self.comm_manager or not self.comm_manager.get_connection_status():
-            self.stop()
-            return
+        self._update_stats()
+        if self.replay:
+            self._update_position()
+            # Replay ends when the producer has played the last record
+            thread = self.controller.thread if self.controller else None
+            if thread is None or not thread.is_alive():
+                self.stop()
+                return
+        elif not self.comm_manager or not self.comm_manager.get_connection_status():
+            # A supervised link is being reconnected: the stream resumes by itself
+            if not (self.link and self.link.reconnecting):
+                self.stop()
+                return
         self.window.after(500, self._check_conn_loop)
 
+    def _update_stats(self):
+        if not self.controller: return
+        q = self.controller.q
+        qs, rs = q.stats, self.controller.stats
+        text = (
+            f"Queue {q.qsize()}/{q.maxsize} ({q.policy}) | "
+            f"dropped {qs['dropped_batches']} batches / {qs['dropped_samples']} samples | "
+            f"coalesced {qs['coalesced']} | blocked {qs['blocked_s']:.1f} s | "
+            f"frame {rs['frame_ms']:.1f} ms @ {rs['interval_ms']:.0f} ms"
+        )
+        if self.recorder:
+            st = self.recorder.stats
+            text += f" | REC {st['duration_s']:.1f} s, {st['bytes'] / 1e6:.2f} MB"
+        link = self.link
+        if link and not self.replay:
+            if link.reconnecting:
+                text += f" | LINK LOST {link.outage_s:.1f} s, reconnecting"
+            elif link.history:
+                last = link.history[-1]
+                text += f" | last outage {last['outage_s']:.1f} s, reconnect {last['reconnect_ms']:.0f} ms"
+        self.stats_label.config(text=text)
+
+    def toggle_recording(self):
+        if self.recorder:
+            self._stop_recording()
+        elif self._is_running and self.controller:
+            self._start_recording()
+        self._update_ui_state()
+
+    def _start_recording(self):
+        from tkinter import filedialog
+        os.makedirs("data/recordings", exist_ok=True)
+        path = filedialog.asksaveasfilename(
+            parent=self.window, title="Record egram to",
+            initialdir="data/recordings",
+            initialfile=time.strftime("egram_%Y%m%d_%H%M%S") + FILE_SUFFIX,
+            defaultextension=FILE_SUFFIX,
+            filetypes=[("Egram recording", "*" + FILE_SUFFIX), ("All files", "*.*")])
+        if not path:
+            return
+        device = ""
+        try:
+            device = self.comm_manager.check_device_identity().get("device_id") or self.comm_manager.serial_mgr.port
+        except Exception:
+            pass
+        try:
+            rec = EgramRecorder(path, self.controller.source.sample_rate, device)
+            rec.start()
+        except OSError as e:
+            messagebox.showerror("Recording Error", f"Cannot write {path}: {e}")
+            return
+        self.recorder = rec
+        self.controller.recorder = rec
+
+    def _stop_recording(self):
+        rec, self.recorder = self.recorder, None
+        if self.controller:
+            self.controller.recorder = None
+        if rec:
+            rec.stop()
+            if rec.error:
+                messagebox.showerror("Recording Error", f"Recording to {rec.path} failed: {rec.error}")
+
+    # ---------- replay ----------
+    def open_recording(self):
+        from tkinter import filedialog
+        path = filedialog.askopenfilename(
+            parent=self.window, title="Open egram recording",
+            initialdir="data/recordings" if os.path.isdir("data/recordings") else ".",
+            filetypes=[("Egram recording", "*" + FILE_SUFFIX), ("All files", "*.*")])
+        if not path:
+            return
+        try:
+            replay = EgramReplaySource(path)
+        except (OSError, ValueError) as e:
+            messagebox.showerror("Replay Error", f"Cannot open {path}: {e}")
+            return
+        self.stop()
+        self.replay = replay
+        self.window.title(f"EG Diagram (Replay: {os.path.basename(path)}"
+                          + (f", {replay.device_name})" if replay.device_name else ")"))
+        self.scrub.config(from_=replay.start_time, to=max(replay.end_time, replay.start_time + 1e-3),
+                          state="normal")
+        self.live_btn.config(state="normal")
+        self._show_at(replay.start_time + self.model.time_span_s)
+        self._update_ui_state()
+
+    def go_live(self):
+        self.stop()
+        self.replay = None
+        self.window.title("EG Diagram (Real-time)")
+        self.scrub.config(state="disabled")
+        self.live_btn.config(state="disabled")
+        self.pos_label.config(text="")
+        self.clear()
+        self._update_ui_state()
+
+    def _show_at(self, t):
+        """Fill the view with the time_span_s of recording ending at t; playback resumes from t."""
+        replay = self.replay
+        i0 = replay.index_of(t - self.model.time_span_s)
+        i1 = replay.index_of(t)
+        self.model.clear()
+        if i1 > i0:
+            chunk = replay.records[i0:i1]
+            self.model.append_batch(np.column_stack([chunk["t"], chunk["atr"], chunk["ven"]]))
+        replay.seek(t)
+        self.canvas.pan_offset_s = 0.0
+        self.canvas.render(self.model)
+        self._update_position()
+
+    def _on_scrub(self, event=None):
+        if not self.replay:
+            return
+        was_running = self._is_running
+        self.stop()
+        self._show_at(float(self.scrub.get()))
+        if was_running:
+            self.start()
+
+    def _update_position(self):
+        if not self.replay:
+            return
+        pos = self.replay.position
+        self.scrub.set(pos)
+        self.pos_label.config(text=f"{pos:.1f} / {self.replay.end_time:.1f} s")
+
     def stop(self):
-        if self.controller: self.controller.stop()
+        if self.controller:
+            self.controller.stop()
+            self.controller.source.close()  # also ends a stream waiting out a reconnect
+        if self.replay:
+            self.replay.close()
+            self._update_position()
         self._is_running = False
+        self._stop_recording()
         self._update_ui_state()
+        self._update_stats()
 
     def clear(self):
-        for b in self.model.buffers.values(): b.clear()
+        self.model.clear()
         self.canvas.render(self.model)
 
     def update_display(self):
@@ -242,12 +734,29 @@ class EgramWindow:
         self.window.destroy()
 
 class PacemakerEgramSource:
-    def __init__(self, comm_manager, sample_rate=200):
+    def __init__(self, comm_manager, sample_rate=200, link=None):
         self.comm_manager = comm_manager
         self.sample_rate = sample_rate
+        self.link = link  # Connection_Manager.ConnectionManager: ride out drops instead of ending
         self.time = 0.0
+        self.outages = 0
+        self._stop = threading.Event()
+
+    def close(self):
+        """End a running stream(), also while it waits for a reconnect."""
+        self._stop.set()
+
+    def _wait_for_link(self, stop):
+        # Poll in short steps so close() is noticed while the link is down
+        while not stop.is_set():
+            if self.link.wait_connected(0.2):
+                return True
+            if not self.link.reconnecting:
+                return False  # user disconnected or the manager gave up
+        return False
 
     def stream(self):
+        stop = self._stop = threading.Event()
         if self.comm_manager is None:
             return
         try:
@@ -264,41 +773,41 @@ class PacemakerEgramSource:
         except Exception:
             return
         try:
-            while True:
+            while not stop.is_set():
                 try:
-                    if not self.comm_manager.get_connection_status():
+                    connected = self.comm_manager.get_connection_status()
+                except Exception:
+                    connected = False
+                if not connected:
+                    if self.link is None:
+                        break
+                    lost_at = time.monotonic()
+                    if not self._wait_for_link(stop):
                         break
+                    # The same comm object was reopened: restart the stream where the device left off,
+                    # keeping the time axis in step with the wall clock across the gap
+                    self.outages += 1
+                    self.time += time.monotonic() - lost_at
+                    serial_mgr.start_egram()
+                    continue
+                # One read drains everything the UART has buffered since the last pass
+                frames = serial_mgr.read_frames()
+                if not frames:
+                    continue
+                try:
+                    amps = serial_mgr.decode_egram_batch(frames)
                 except Exception:
-                    break
-                batch = []
-                for _ in range(10):
-                    pkt = serial_mgr.read_packet(timeout=0.1)
-                    if not pkt:
-                        continue
-                    try:
-                        parsed = serial_mgr.parse_packet(pkt)
-                    except Exception:
-                        parsed = None
-                    if not parsed:
-                        continue
-                    data = parsed.get("data", b"")
-                    if not data:
-                        continue
-                    try:
-                        decoded = serial_mgr.decode_egram(data)
-                        a_amp = float(decoded.get("m_araw", 0.0))
-                        v_amp = float(decoded.get("m_vraw", 0.0))
-                    except Exception:
-                        a_amp, v_amp = 0.0, 0.0
-                    t = self.time
-                    batch.append((t, a_amp, v_amp))
-                    self.time += 1.0 / self.sample_rate
-                if batch:
-                    yield batch
-                else:
-                    time.sleep(0.01)
+                    continue
+                n = len(amps)
+                if not n:
+                    continue  # only non-egram replies in this read
+                batch = np.empty((n, 3), dtype=np.float64)
+                batch[:, 0] = self.time + np.arange(n) / self.sample_rate
+                batch[:, 1:] = amps
+                self.time += n / self.sample_rate
+                yield batch
         finally:
             try:
                 serial_mgr.stop_egram()
             except Exception:
-                pass
\ No newline at end of file
+                pass
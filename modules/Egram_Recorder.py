@@ -0,0 +1,155 @@
+# This file records egram batches to an append-only binary file on a background writer thread.
+#
+# File layout (little-endian):
+#   header, HEADER_LEN bytes: magic b"DCMEGRM1", version u16, header length u16,
+#                             start time f64 (Unix s), sample rate f32, channels u8,
+#                             device name (32 bytes UTF-8, NUL padded), padding
+#   records, RECORD_DTYPE.itemsize (16) bytes each: t f64, atrial f32, ventricular f32
+# The sample count is not stored: it is (file size - HEADER_LEN) // 16, so a
+# recording cut short by a crash is still readable up to its last full record.
+from __future__ import annotations
+from typing import Any, Dict, Optional, Tuple
+import os
+import queue
+import struct
+import threading
+import time
+
+import numpy as np
+
+MAGIC = b"DCMEGRM1"
+VERSION = 1
+HEADER_FMT = "<8sHHdfB32s"
+HEADER_LEN = 64
+RECORD_DTYPE = np.dtype([("t", "<f8"), ("atr", "<f4"), ("ven", "<f4")])
+FILE_SUFFIX = ".egm"
+
+def pack_header(sample_rate: float, device_name: str = "", start_time: Optional[float] = None) -> bytes:
+    name = (device_name or "").encode("utf-8")[:32]
+    head = struct.pack(HEADER_FMT, MAGIC, VERSION, HEADER_LEN,
+                       time.time() if start_time is None else start_time,
+                       float(sample_rate), 2, name)
+    return head.ljust(HEADER_LEN, b"\0")
+
+def read_header(raw: bytes) -> Dict[str, Any]:
+    if len(raw) < struct.calcsize(HEADER_FMT):
+        raise ValueError("file too short for an egram recording header")
+    magic, version, header_len, start, rate, channels, name = struct.unpack_from(HEADER_FMT, raw)
+    if magic != MAGIC:
+        raise ValueError("not an egram recording (bad magic)")
+    if version != VERSION:
+        raise ValueError(f"unsupported egram recording version {version}")
+    return {
+        "version": version,
+        "header_len": header_len,
+        "start_time": start,
+        "sample_rate": rate,
+        "channels": channels,
+        "device_name": name.rstrip(b"\0").decode("utf-8", "replace"),
+    }
+
+def to_records(batch) -> np.ndarray:
+    """(n, 3) [t, atrial, ventricular] rows -> RECORD_DTYPE array."""
+    arr = np.asarray(batch, dtype=np.float64).reshape(-1, 3)
+    rec = np.empty(len(arr), dtype=RECORD_DTYPE)
+    rec["t"] = arr[:, 0]
+    rec["atr"] = arr[:, 1]
+    rec["ven"] = arr[:, 2]
+    return rec
+
+def load_recording(path: str) -> Tuple[Dict[str, Any], np.ndarray]:
+    """Header dict plus all complete records, read into memory."""
+    with open(path, "rb") as f:
+        header = read_header(f.read(HEADER_LEN))
+        f.seek(header["header_len"])
+        data = f.read()
+    n = len(data) // RECORD_DTYPE.itemsize
+    return header, np.frombuffer(data, dtype=RECORD_DTYPE, count=n)
+
+class EgramRecorder:
+    """
+    Streams egram batches to disk without slowing down whoever produces them.
+
+    write() only puts the batch on an unbounded queue (O(1), never blocks, never
+    drops); the writer thread converts batches to fixed-width records and writes
+    them through a large buffered file, flushing at most every flush_interval
+    seconds. Call stop() to drain the queue and close the file.
+    """
+
+    def __init__(self, path: str, sample_rate: float, device_name: str = "",
+                 buffer_size: int = 256 * 1024, flush_interval: float = 1.0) -> None:
+        self.path = path
+        self.sample_rate = sample_rate
+        self.device_name = device_name
+        self.buffer_size = buffer_size
+        self.flush_interval = flush_interval
+        self._q: "queue.SimpleQueue" = queue.SimpleQueue()
+        self._thread: Optional[threading.Thread] = None
+        self._file = None
+        self.error: Optional[BaseException] = None
+        self.stats = {"batches": 0, "samples": 0, "bytes": 0, "duration_s": 0.0}
+
+    @property
+    def recording(self) -> bool:
+        return self._thread is not None
+
+    def start(self) -> None:
+        if self._thread is not None:
+            return
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        self._file = open(self.path, "wb", buffering=self.buffer_size)
+        self._file.write(pack_header(self.sample_rate, self.device_name))
+        self.stats["bytes"] = HEADER_LEN
+        self._thread = threading.Thread(target=self._run, name="egram-recorder", daemon=True)
+        self._thread.start()
+
+    def write(self, batch) -> None:
+        """Queue an (n, 3) [t, atrial, ventricular] batch for writing."""
+        if self._thread is not None:
+            self._q.put(batch)
+
+    def stop(self) -> None:
+        """Write everything queued so far, then close the file."""
+        if self._thread is None:
+            return
+        self._q.put(None)
+        self._thread.join()
+        self._thread = None
+
+    def _run(self) -> None:
+        f = self._file
+        last_flush = time.monotonic()
+        t_first = None
+        try:
+            while True:
+                try:
+                    batch = self._q.get(timeout=self.flush_interval)
+                except queue.Empty:
+                    batch = ()
+                if batch is None:
+                    break
+                if len(batch):
+                    rec = to_records(batch)
+                    f.write(rec.tobytes())
+                    st = self.stats
+                    st["batches"] += 1
+                    st["samples"] += len(rec)
+                    st["bytes"] += rec.nbytes
+                    if t_first is None:
+                        t_first = float(rec["t"][0])
+                    st["duration_s"] = float(rec["t"][-1]) - t_first
+                now = time.monotonic()
+                if now - last_flush >= self.flush_interval:
+                    f.flush()
+                    last_flush = now
+        except Exception as e:
+            self.error = e
+            # Keep draining so producers never see a growing queue after a disk error
+            while self._q.get() is not None:
+                pass
+        finally:
+            try:
+                f.close()
+            except OSError:
+                pass
+            self._file = None
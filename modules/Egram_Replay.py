@@ -0,0 +1,139 @@
+# This file replays recorded egram files (see Egram_Recorder) through EgramController, memory-mapped.
+from __future__ import annotations
+from typing import Any, Dict, Iterator, Optional
+import os
+import threading
+import time
+
+import numpy as np
+
+try:
+    from .Egram_Recorder import HEADER_LEN, RECORD_DTYPE, read_header
+except ImportError:
+    from modules.Egram_Recorder import HEADER_LEN, RECORD_DTYPE, read_header
+
+SPEEDS = ("1x", "2x", "5x", "10x", "max")
+
+def parse_speed(label: str) -> Optional[float]:
+    """'5x' -> 5.0, 'max' -> None (no pacing)."""
+    label = label.strip().lower()
+    if label == "max":
+        return None
+    return float(label.rstrip("x"))
+
+class EgramReplaySource:
+    """
+    Drop-in for PacemakerEgramSource that reads an .egm recording.
+
+    The records are a numpy.memmap, so opening is instant and memory use does
+    not grow with the file: only the pages being played (or searched) are read.
+    stream() yields (n, 3) [t, atrial, ventricular] batches paced to `speed`
+    times real time (None = as fast as the consumer takes them), starting at
+    the current position; seek() moves that position to any timestamp.
+    """
+
+    def __init__(self, path: str, speed: Optional[float] = 1.0, batch_s: float = 0.05,
+                 max_batch: int = 4096, index_stride: int = 4096) -> None:
+        self.path = path
+        with open(path, "rb") as f:
+            self.header: Dict[str, Any] = read_header(f.read(HEADER_LEN))
+        offset = self.header["header_len"]
+        n = max(0, (os.path.getsize(path) - offset) // RECORD_DTYPE.itemsize)
+        self.records = (np.memmap(path, dtype=RECORD_DTYPE, mode="r", offset=offset, shape=(n,))
+                        if n else np.empty(0, dtype=RECORD_DTYPE))
+        self.sample_rate = self.header["sample_rate"] or 200.0
+        self.device_name = self.header["device_name"]
+        self.speed = speed
+        self.batch_s = batch_s
+        self.max_batch = max_batch
+        self.index_stride = index_stride
+        self._index: Optional[np.ndarray] = None
+        self._pos = 0
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+
+    def __len__(self) -> int:
+        return len(self.records)
+
+    @property
+    def start_time(self) -> float:
+        return float(self.records["t"][0]) if len(self.records) else 0.0
+
+    @property
+    def end_time(self) -> float:
+        return float(self.records["t"][-1]) if len(self.records) else 0.0
+
+    @property
+    def position(self) -> float:
+        """Timestamp of the next sample to be played."""
+        with self._lock:
+            pos = self._pos
+        if pos >= len(self.records):
+            return self.end_time
+        return float(self.records["t"][pos])
+
+    def _coarse_index(self) -> np.ndarray:
+        # Every index_stride-th timestamp (one page touched per 64 KiB of file),
+        # built on the first seek so opening never scans the file
+        if self._index is None:
+            self._index = np.array(self.records["t"][::self.index_stride])
+        return self._index
+
+    def index_of(self, t: float) -> int:
+        """First record with timestamp >= t."""
+        n = len(self.records)
+        if not n:
+            return 0
+        block = int(np.searchsorted(self._coarse_index(), t, side="right")) - 1
+        lo = max(block, 0) * self.index_stride
+        hi = min(lo + self.index_stride + 1, n)
+        return lo + int(np.searchsorted(self.records["t"][lo:hi], t, side="left"))
+
+    def seek(self, t: float) -> None:
+        i = self.index_of(t)
+        with self._lock:
+            self._pos = i
+
+    def close(self) -> None:
+        """End a running stream() at its next batch."""
+        self._stop.set()
+
+    def stream(self) -> Iterator[np.ndarray]:
+        # Each stream gets its own stop event, so close() + a new stream() cannot revive an old one
+        stop = self._stop = threading.Event()
+        recs = self.records
+        n = len(recs)
+        speed = self.speed
+        wall0 = rec0 = None
+        expected = None
+        while not stop.is_set():
+            with self._lock:
+                pos = self._pos
+            if pos >= n:
+                return
+            if pos != expected:
+                wall0 = None  # started or seeked: pace from here
+            if speed is None:
+                end = min(pos + self.max_batch, n)
+            else:
+                t_pos = float(recs["t"][pos])
+                if wall0 is None:
+                    wall0, rec0 = time.perf_counter(), t_pos
+                # Everything due by the end of this batch interval, in recording time
+                due = rec0 + (time.perf_counter() - wall0 + self.batch_s) * speed
+                end = pos + int(np.searchsorted(recs["t"][pos:min(pos + self.max_batch, n)], due, side="right"))
+                end = max(end, pos + 1)
+            chunk = recs[pos:end]
+            batch = np.empty((len(chunk), 3), dtype=np.float64)
+            batch[:, 0] = chunk["t"]
+            batch[:, 1] = chunk["atr"]
+            batch[:, 2] = chunk["ven"]
+            with self._lock:
+                if self._pos == pos:  # a seek() in between wins
+                    self._pos = end
+            expected = end
+            yield batch
+            if speed is not None and end < n:
+                wait = (float(recs["t"][end]) - rec0) / speed - (time.perf_counter() - wall0)
+                if wait > 0:
+                    stop.wait(wait)
@@ -0,0 +1,164 @@
+# This file programs several pacemakers at once (one serial port each), for flashing a rack of boards without the GUI.
+#
+#   python -m modules.Multi_Programmer --params data/parameters.json            (every port found)
+#   python -m modules.Multi_Programmer --ports /dev/ttyACM0 /dev/ttyACM1 --mode VVI
+from __future__ import annotations
+from typing import Any, Callable, Dict, List, Optional, Sequence
+from concurrent.futures import ThreadPoolExecutor
+import argparse
+import json
+import sys
+import time
+
+try:
+    from .Communication import PacemakerCommunication
+    from .Serial_Manager import SerialManager
+    from .mode_config import ParamEnum
+except ImportError:
+    from modules.Communication import PacemakerCommunication
+    from modules.Serial_Manager import SerialManager
+    from modules.mode_config import ParamEnum
+
+MODES = list(ParamEnum.MODES.keys())
+
+class MultiProgrammer:
+    """
+    Runs program_and_verify() on many ports concurrently.
+
+    Each port gets its own PacemakerCommunication and worker thread; the work is
+    I/O bound (pyserial releases the GIL while waiting), so the batch takes about
+    as long as the slowest device rather than the sum of all of them.
+    """
+
+    def __init__(self, ports: Optional[Sequence[str]] = None, baudrate: int = 115200,
+                 timeout: float = 2.0, max_workers: Optional[int] = None,
+                 comm_factory: Callable[..., PacemakerCommunication] = PacemakerCommunication) -> None:
+        self.ports = list(ports) if ports else SerialManager.list_available_ports()
+        self.baudrate = baudrate
+        self.timeout = timeout
+        self.max_workers = max_workers
+        self.comm_factory = comm_factory
+
+    def _program_one(self, port: str, mode: int, parameters: Dict[str, Any]) -> Dict[str, Any]:
+        row = {
+            "port": port,
+            "success": False,
+            "verified": False,
+            "message": "",
+            "mismatches": [],
+            "latency_ms": None,
+            "total_ms": None,
+        }
+        t0 = time.perf_counter()
+        comm = self.comm_factory(port=port, baudrate=self.baudrate)
+        try:
+            if not comm.connect():
+                row["message"] = "Could not open port"
+                return row
+            res = comm.program_and_verify(mode, parameters, timeout=self.timeout)
+            row["success"] = res["success"]
+            row["verified"] = res["verified"]
+            row["message"] = res["message"]
+            row["mismatches"] = res["mismatches"]
+            row["latency_ms"] = res["latency_ms"]
+        except Exception as e:
+            row["message"] = "Program/verify error: {}".format(str(e))
+        finally:
+            comm.disconnect()
+            row["total_ms"] = round((time.perf_counter() - t0) * 1000.0, 3)
+        return row
+
+    def program_all(self, mode: int, parameters: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Program every port; rows come back in port order. "elapsed_ms" is the
+        wall time of the whole batch, "sum_device_ms" what running the devices
+        one after another would have cost.
+        """
+        report = {
+            "results": [],
+            "succeeded": 0,
+            "failed": 0,
+            "elapsed_ms": 0.0,
+            "sum_device_ms": 0.0,
+        }
+        if not self.ports:
+            return report
+        t0 = time.perf_counter()
+        workers = self.max_workers or len(self.ports)
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="dcm-prog") as pool:
+            rows = list(pool.map(lambda p: self._program_one(p, mode, parameters), self.ports))
+        report["elapsed_ms"] = round((time.perf_counter() - t0) * 1000.0, 3)
+        report["results"] = rows
+        report["succeeded"] = sum(1 for r in rows if r["verified"])
+        report["failed"] = len(rows) - report["succeeded"]
+        report["sum_device_ms"] = round(sum(r["total_ms"] or 0.0 for r in rows), 3)
+        return report
+
+def format_summary(report: Dict[str, Any]) -> str:
+    """Plain-text table of a program_all() report."""
+    rows = report["results"]
+    port_w = max([len("Port")] + [len(r["port"]) for r in rows])
+    lines = ["{:<{w}}  {:<8}  {:>10}  {:>10}  {}".format(
+        "Port", "Result", "Rtt (ms)", "Total (ms)", "Message", w=port_w)]
+    for r in rows:
+        status = "OK" if r["verified"] else ("MISMATCH" if r["success"] else "FAIL")
+        lat = "-" if r["latency_ms"] is None else "{:.1f}".format(r["latency_ms"])
+        total = "-" if r["total_ms"] is None else "{:.1f}".format(r["total_ms"])
+        lines.append("{:<{w}}  {:<8}  {:>10}  {:>10}  {}".format(
+            r["port"], status, lat, total, r["message"], w=port_w))
+    lines.append("{} of {} verified in {:.1f} ms (sequential would be ~{:.1f} ms)".format(
+        report["succeeded"], len(rows), report["elapsed_ms"], report["sum_device_ms"]))
+    return "\n".join(lines)
+
+def load_parameter_file(path: str) -> Dict[str, Any]:
+    """
+    parameters.json as written by ParameterManager.save_params(), validated
+    through the ParamEnum setters (ValueError lists every rejected key).
+    Missing values take the defaults; "Pacing_Mode" is passed through.
+    """
+    with open(path, "r") as f:
+        data = json.load(f)
+    if not isinstance(data, dict):
+        raise ValueError("expected a JSON object of parameter values")
+    param = ParamEnum()
+    errors = param.update_from_dict(data)
+    if errors:
+        raise ValueError("; ".join(f"{k}: {msg}" for k, msg in errors.items()))
+    params = param.get_default_values()
+    if "Pacing_Mode" in data:
+        params["Pacing_Mode"] = data["Pacing_Mode"]
+    return params
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Program and verify several pacemakers in parallel")
+    parser.add_argument("--ports", nargs="*", help="serial ports (default: every port found)")
+    parser.add_argument("--params", default="data/parameters.json", help="parameter file to program")
+    parser.add_argument("--mode", choices=MODES, help="pacing mode (default: Pacing_Mode from the file)")
+    parser.add_argument("--baudrate", type=int, default=115200)
+    parser.add_argument("--timeout", type=float, default=2.0, help="per-device echo timeout in seconds")
+    parser.add_argument("--workers", type=int, default=None, help="max concurrent devices (default: all)")
+    parser.add_argument("--json", action="store_true", help="print the report as JSON instead of a table")
+    args = parser.parse_args(argv)
+
+    try:
+        params = load_parameter_file(args.params)
+    except (OSError, ValueError) as e:
+        print("Failed to load {}: {}".format(args.params, e), file=sys.stderr)
+        return 2
+    mode_name = args.mode or params.pop("Pacing_Mode", "AOO")
+    params.pop("Pacing_Mode", None)
+    if mode_name not in MODES:
+        print("Unknown pacing mode: {}".format(mode_name), file=sys.stderr)
+        return 2
+
+    programmer = MultiProgrammer(args.ports, baudrate=args.baudrate,
+                                 timeout=args.timeout, max_workers=args.workers)
+    if not programmer.ports:
+        print("No serial ports found", file=sys.stderr)
+        return 2
+    report = programmer.program_all(MODES.index(mode_name), params)
+    print(json.dumps(report, indent=2) if args.json else format_summary(report))
+    return 0 if report["failed"] == 0 else 1
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -4,12 +4,11 @@ from tkinter import ttk, messagebox
 import json
 import os
 from .mode_config import ParamEnum
-from typing import Optional
+from typing import Optional, TYPE_CHECKING
 
-try:
+if TYPE_CHECKING:  # the serial stack is only loaded once a port is scanned / connected
     from .Communication import PacemakerCommunication
-except ImportError:
-    from modules.Communication import PacemakerCommunication
+    from .Async_Serial import TkAsyncBridge
 
 
 DEFAULT_PARAMS = ParamEnum().get_default_values()
@@ -104,7 +103,8 @@ class ParameterManager:
         ]
 
 class ParameterWindow:
-    def __init__(self, parent, param_manager, comm_manager: Optional[PacemakerCommunication]):
+    def __init__(self, parent, param_manager, comm_manager: Optional["PacemakerCommunication"],
+                 bridge: Optional["TkAsyncBridge"] = None):
         self.param_win = tk.Toplevel(parent)
         self._saved_ok = True
         self._device_synced = False 
@@ -113,6 +113,7 @@ class ParameterWindow:
         self.param_win.geometry("900x500")
         self.param_manager = param_manager
         self.comm_manager = comm_manager
+        self.bridge = bridge  # runs the device round trip off the Tk thread
         self.param_win.protocol("WM_DELETE_WINDOW", self._on_close)
 
         ttk.Label(self.param_win, text="Programmable Parameters", font=("Arial", 14)).pack(pady=10)
@@ -285,14 +286,42 @@ class ParameterWindow:
             if getter:
                 params_to_send[key] = getter()
         
-        result = self.comm_manager.upload_parameters(
-            mode=mode_int, 
-            parameters=params_to_send
-        )
-        
-        if result['success']:
+        if self.bridge is None:
+            self._show_upload_result(self.comm_manager.program_and_verify(
+                mode=mode_int,
+                parameters=params_to_send
+            ))
+            return
+
+        self.load_btn.configure(state="disabled")
+        self.bridge.submit(self.comm_manager.core.program_and_verify(mode=mode_int, parameters=params_to_send),
+                           on_done=self._show_upload_result, on_error=self._upload_error)
+
+    def _upload_done(self) -> bool:
+        """Re-enable Load once a background upload finishes; False if the window is gone."""
+        try:
+            if not self.param_win.winfo_exists():
+                return False
+            self.load_btn.configure(state="normal")
+        except tk.TclError:
+            return False
+        return True
+
+    def _upload_error(self, exc):
+        if self._upload_done():
+            messagebox.showerror("Upload Failed", f"Device communication error: {exc}")
+
+    def _show_upload_result(self, result):
+        if not self._upload_done():
+            return
+        if result['success'] and result['verified']:
             self._device_synced = True
-            messagebox.showinfo("Success", "JSON parameters loaded and uploaded to Pacemaker successfully!")
+            messagebox.showinfo("Success", "JSON parameters uploaded to Pacemaker and verified by read-back!")
+        elif result['success']:
+            self._device_synced = False
+            lines = [f"{k}: sent {d['sent']}, device has {d['received']}"
+                     for k, d in result['diff'].items() if not d['ok']]
+            messagebox.showerror("Verification Failed", "Pacemaker read-back differs:\n" + "\n".join(lines))
         else:
             self._device_synced = False
             messagebox.showerror("Upload Failed", f"Device communication error: {result['message']}")
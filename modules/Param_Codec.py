@@ -0,0 +1,238 @@
+# This file holds the single field table for the 30-byte pacemaker parameter block and the codec compiled from it.
+from __future__ import annotations
+from typing import Any, Callable, Dict, Mapping, NamedTuple, Optional, Tuple
+import operator
+import struct
+
+BLOCK_LEN = 30  # parameter block carried in the data field of K_PPARAMS / K_ECHO frames
+
+ACTIVITY_MAP: Dict[str, int] = {
+    "V-Low": 0, "Low": 1, "Med-Low": 2, "Med": 3,
+    "Med-High": 4, "High": 5, "V-High": 6,
+}
+RATE_SMOOTHING_MAP: Dict[str, int] = {
+    "Off": 0, "3%": 1, "6%": 2, "9%": 3, "12%": 4,
+    "15%": 5, "18%": 6, "21%": 7, "25%": 8,
+}
+HYSTERESIS_MAP: Dict[str, int] = {
+    "Off": 0, "On": 1,
+    # spellings accepted from JSON files / older callers
+    "off": 0, "on": 1, "0": 0, "1": 1, "false": 0, "true": 1, "no": 0, "yes": 1,
+}
+
+class ParamField(NamedTuple):
+    """
+    One parameter in the block.
+    raw (firmware) value = round(ui value * scale) for rounded / scaled fields,
+    int(ui value) (truncating) for the rest, or enum[ui value].
+    """
+    key: str                      # firmware key used by build_data_packet()
+    ui: str                       # ParamEnum / UI name
+    offset: int                   # byte offset inside the 30-byte block
+    fmt: str                      # struct code: "B" uint8, "H" uint16
+    default: int                  # raw value used when the UI value is missing or invalid
+    scale: float = 1.0
+    enum: Optional[Mapping[str, int]] = None
+    decimals: Optional[int] = None  # rounding applied to decoded UI values
+    as_float: bool = False          # decode to float (pulse widths are shown as 1.0)
+    fallback: Optional[str] = None  # decoded label for raw values missing from enum
+    rounded: bool = False           # UI value is rounded, not truncated (rates, pulse widths)
+    pack_default: Optional[int] = None  # used by pack() for a missing firmware key (None: default)
+
+# The one place the layout is written down (see tests/D2_Design_Idea.md)
+PARAM_FIELDS: Tuple[ParamField, ...] = (
+    ParamField("p_pacingMode",        "Pacing_Mode",             0,  "B", 0),
+    ParamField("p_LRL",               "Lower_Rate_Limit",        1,  "B", 60, rounded=True),
+    ParamField("p_URL",               "Upper_Rate_Limit",        2,  "B", 120, rounded=True),
+    ParamField("p_MaxSensorRate",     "Maximum_Sensor_Rate",     3,  "B", 120, rounded=True),
+    ParamField("p_ARP",               "ARP",                     4,  "H", 320),
+    ParamField("p_VRP",               "VRP",                     6,  "H", 320),
+    ParamField("p_PVARP",             "PVARP",                   8,  "H", 250),
+    ParamField("p_aPaceWidth",        "Atrial_Pulse_Width",      10, "B", 1, as_float=True, rounded=True),
+    ParamField("p_vPaceWidth",        "Ventricular_Pulse_Width", 11, "B", 1, as_float=True, rounded=True),
+    ParamField("p_aPaceAmp",          "Atrial_Amplitude",        12, "H", 500, scale=100.0, decimals=1),
+    ParamField("p_vPaceAmp",          "Ventricular_Amplitude",   14, "H", 500, scale=100.0, decimals=1),
+    ParamField("p_aSens",             "Atrial_Sensitivity",      16, "H", 500, scale=100.0, decimals=1),
+    ParamField("p_vSens",             "Ventricular_Sensitivity", 18, "H", 500, scale=100.0, decimals=1),
+    ParamField("p_ActivityThreshold", "Activity_Threshold",      20, "B", 3, enum=ACTIVITY_MAP, fallback="Med",
+               pack_default=0),
+    ParamField("p_ReactionTime",      "Reaction_Time",           21, "B", 30),
+    ParamField("p_ResponseFactor",    "Response_Factor",         22, "B", 8),
+    ParamField("p_RecoveryTime",      "Recovery_Time",           23, "B", 5),
+    ParamField("p_hysteresisFlag",    "Hysteresis",              24, "B", 0, enum=HYSTERESIS_MAP, fallback="On"),
+    ParamField("p_RateSmoothing",     "Rate_Smoothing",          25, "B", 0, enum=RATE_SMOOTHING_MAP, fallback="Off"),
+)
+
+def _compile_format(fields: Tuple[ParamField, ...], length: int) -> str:
+    """Little-endian struct format for the table, with 'x' padding for gaps and the tail."""
+    fmt, pos = "<", 0
+    for f in sorted(fields, key=lambda f: f.offset):
+        if f.offset < pos:
+            raise ValueError(f"field {f.key} overlaps the previous field")
+        if f.offset > pos:
+            fmt += f"{f.offset - pos}x"
+        fmt += f.fmt
+        pos = f.offset + struct.calcsize("<" + f.fmt)
+    if pos > length:
+        raise ValueError(f"parameter fields need {pos} bytes, block has {length}")
+    if pos < length:
+        fmt += f"{length - pos}x"
+    return fmt
+
+def _encoder(field: ParamField):
+    """Compile the UI -> raw conversion for one field; missing/invalid -> None."""
+    scale, enum = field.scale, field.enum
+    if enum is HYSTERESIS_MAP:
+        lower = {k.lower(): v for k, v in enum.items()}
+
+        def encode_flag(value):
+            # "on" / "true" / "yes" / "1" or any non-zero number; everything else is off
+            if isinstance(value, str):
+                return lower.get(value.strip().lower(), 0)
+            if isinstance(value, (int, float, bool)):
+                return 1 if int(value) != 0 else 0
+            return None
+        return encode_flag
+
+    if enum is not None:
+        def encode_enum(value):
+            if value is None:
+                return None
+            if value in enum:
+                return enum[value]
+            try:
+                return int(value)
+            except (TypeError, ValueError, OverflowError):
+                return None
+        return encode_enum
+
+    if field.rounded or scale != 1.0:
+        def encode_rounded(value):
+            if value is None:
+                return None
+            if type(value) is int and scale == 1.0:
+                return value
+            try:
+                number = float(value)
+            except (TypeError, ValueError):
+                return None
+            # nan / inf parse but cannot be rounded: that is an error, not a default
+            return int(round(number * scale))
+        return encode_rounded
+
+    def encode_int(value):
+        if value is None:
+            return None
+        try:
+            return int(value)
+        except (TypeError, ValueError, OverflowError):
+            return None
+    return encode_int
+
+def _decoder(field: ParamField) -> Optional[Callable[[int], Any]]:
+    """Compile the raw -> UI conversion for one field (None: value is used as-is)."""
+    if field.enum is not None:
+        rev: Dict[int, str] = {}
+        for k, v in field.enum.items():
+            rev.setdefault(v, k)  # first spelling listed is the canonical UI label
+        fallback = field.fallback
+        return lambda raw: rev.get(raw, fallback)
+    if field.scale != 1.0:
+        scale, decimals = field.scale, field.decimals
+        if decimals is None:
+            return lambda raw: raw / scale
+        return lambda raw: round(raw / scale, decimals)
+    if field.as_float:
+        return float
+    return None
+
+class ParamCodec:
+    """
+    Encoder/decoder compiled once from a field table.
+
+    The struct.Struct, per-field converters and reverse enum maps are built
+    once here; pack_into() writes straight into a caller-owned buffer
+    (e.g. a frame being assembled) so encoding needs no intermediate bytes objects.
+    """
+
+    def __init__(self, fields: Tuple[ParamField, ...] = PARAM_FIELDS, length: int = BLOCK_LEN) -> None:
+        self.fields = tuple(sorted(fields, key=lambda f: f.offset))
+        self.length = length
+        self.format = _compile_format(self.fields, length)
+        self.struct = struct.Struct(self.format)
+        self.keys = tuple(f.key for f in self.fields)
+        self._by_key = {f.key: f for f in self.fields}
+        self._getter = operator.itemgetter(*self.keys)
+        self._encoders = tuple((f.key, f.ui, f.default, _encoder(f)) for f in self.fields)
+        self._decoders = tuple((f.ui, _decoder(f)) for f in self.fields)
+        self._packers = tuple(
+            (f.key, f.default if f.pack_default is None else f.pack_default, f.as_float)
+            for f in self.fields)
+        self._scratch = bytearray(length)
+
+    # ---------- UI values -> firmware units ----------
+    def to_raw(self, field: ParamField, value: Any) -> int:
+        """Convert one UI value to its raw field value; missing/invalid -> default."""
+        raw = _encoder(field)(value)
+        return field.default if raw is None else raw
+
+    def ui_to_firmware(self, mode: Any, ui_params: Optional[Mapping[str, Any]]) -> Dict[str, int]:
+        """UI-named values -> firmware-keyed raw values (input of build_data_packet())."""
+        get = (ui_params or {}).get
+        p: Dict[str, int] = {}
+        for key, ui, default, enc in self._encoders:
+            if key == "p_pacingMode":
+                try:
+                    p[key] = int(mode)
+                except (TypeError, ValueError):
+                    p[key] = 0
+                continue
+            raw = enc(get(ui))
+            if raw is None:
+                # MSR follows URL unless a valid rate is given
+                raw = p["p_URL"] if key == "p_MaxSensorRate" else default
+            p[key] = raw
+        return p
+
+    # ---------- firmware units <-> bytes ----------
+    def pack_into(self, buf, offset: int, fw_params: Optional[Mapping[str, Any]], mode: Any = 0) -> None:
+        """Pack firmware-keyed values into buf[offset:offset + length]."""
+        p = fw_params or {}
+        try:
+            # Fast path: complete dict of ints, as produced by ui_to_firmware()
+            self.struct.pack_into(buf, offset, *self._getter(p))
+            return
+        except (KeyError, TypeError, struct.error):
+            pass
+        # Same conversions as the firmware dict always had: pulse widths may be
+        # fractional ms and are rounded, every other value goes through int()
+        values = []
+        for key, default, as_float in self._packers:
+            if key == "p_pacingMode":
+                default = mode
+            elif key == "p_MaxSensorRate":
+                default = p.get("p_URL", self._by_key["p_URL"].default)
+            value = p.get(key, default)
+            values.append(int(round(float(value))) if as_float else int(value))
+        self.struct.pack_into(buf, offset, *values)
+
+    def pack(self, fw_params: Optional[Mapping[str, Any]], mode: Any = 0) -> bytes:
+        self.pack_into(self._scratch, 0, fw_params, mode)
+        return bytes(self._scratch)
+
+    def unpack_raw(self, data: bytes) -> Dict[str, int]:
+        """Bytes -> firmware-keyed raw values."""
+        if len(data) != self.length:
+            raise ValueError("params data length error")
+        return dict(zip(self.keys, self.struct.unpack(data)))
+
+    def decode(self, data: bytes) -> Dict[str, Any]:
+        """Bytes -> UI-named, UI-unit values (what the parameter window shows)."""
+        if len(data) != self.length:
+            raise ValueError("params data length error")
+        return {ui: raw if dec is None else dec(raw)
+                for (ui, dec), raw in zip(self._decoders, self.struct.unpack(data))}
+
+PARAM_CODEC = ParamCodec()
+PARAM_FORMAT = PARAM_CODEC.format  # "<BBBBHHHBBHHHHBBBBBB4x"
+PARAM_KEYS = PARAM_CODEC.keys
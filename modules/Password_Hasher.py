@@ -0,0 +1,192 @@
+# This file hashes and verifies DCM passwords (salted PBKDF2-SHA256) with a work factor calibrated to the host.
+#
+#   python -m modules.Password_Hasher                 hashes/sec at a range of iteration counts
+#   python -m modules.Password_Hasher --recalibrate   re-measure the iteration count for this host
+#
+# Stored format: "pbkdf2_sha256$<iterations>$<salt b64>$<hash b64>". The iteration
+# count travels with each user's hash, so the cost can be raised at any time:
+# older hashes still verify and are re-hashed on the next successful login.
+from __future__ import annotations
+from typing import Any, Dict, List, Optional, Sequence
+import argparse
+import base64
+import hashlib
+import hmac
+import json
+import os
+import platform
+import secrets
+import threading
+import time
+
+ALGORITHM = "pbkdf2_sha256"
+DIGEST = "sha256"
+SALT_BYTES = 16
+DEFAULT_TARGET_MS = 100.0  # login latency to aim for; DCM_HASH_TARGET_MS overrides
+MIN_ITERATIONS = 100_000  # floor regardless of how slow the host is
+CALIBRATION_FILE = "data/hash_cost.json"
+
+_lock = threading.Lock()
+_iterations: Optional[int] = None
+
+def _target_ms() -> float:
+    raw = os.environ.get("DCM_HASH_TARGET_MS")
+    if raw is None:
+        return DEFAULT_TARGET_MS
+    try:
+        value = float(raw)
+    except ValueError:
+        value = 0.0
+    if not value > 0:  # also rejects nan
+        print(f"[Password_Hasher] Ignoring DCM_HASH_TARGET_MS={raw!r}; using {DEFAULT_TARGET_MS:.0f} ms")
+        return DEFAULT_TARGET_MS
+    return value
+
+TARGET_MS = _target_ms()
+
+def _b64(raw: bytes) -> str:
+    return base64.b64encode(raw).decode("ascii").rstrip("=")
+
+def _unb64(text: str) -> bytes:
+    return base64.b64decode(text + "=" * (-len(text) % 4))
+
+def _pbkdf2(password: str, salt: bytes, iterations: int) -> bytes:
+    return hashlib.pbkdf2_hmac(DIGEST, password.encode(), salt, iterations)
+
+def _time_hash(iterations: int, repeat: int = 3) -> float:
+    """Best-of-n wall time of one hash, in seconds."""
+    salt = b"\0" * SALT_BYTES
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        _pbkdf2("calibration", salt, iterations)
+        best = min(best, time.perf_counter() - t0)
+    return best
+
+def _host_key() -> str:
+    return "{}|{}|{}".format(platform.node(), platform.machine(), platform.python_version())
+
+def calibrate(target_ms: float = TARGET_MS) -> int:
+    """Iteration count whose hash takes about target_ms on this host (rounded to 1000, >= MIN_ITERATIONS)."""
+    probe = 20_000
+    per_iter = _time_hash(probe) / probe
+    iterations = int(round(target_ms / 1000.0 / per_iter, -3))
+    return max(MIN_ITERATIONS, iterations)
+
+def _load_calibration() -> Optional[int]:
+    try:
+        with open(CALIBRATION_FILE, "r") as f:
+            data = json.load(f)
+        entry = data.get(_host_key())
+        if entry and entry.get("target_ms") == TARGET_MS:
+            return int(entry["iterations"])
+    except (OSError, ValueError, TypeError, KeyError):
+        pass
+    return None
+
+def _save_calibration(iterations: int) -> None:
+    try:
+        try:
+            with open(CALIBRATION_FILE, "r") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            data = {}
+        data[_host_key()] = {"iterations": iterations, "target_ms": TARGET_MS,
+                             "measured": time.strftime("%Y-%m-%dT%H:%M:%S")}
+        os.makedirs(os.path.dirname(CALIBRATION_FILE) or ".", exist_ok=True)
+        with open(CALIBRATION_FILE, "w") as f:
+            json.dump(data, f, indent=2)
+    except OSError:
+        pass  # calibration is re-measured next start; nothing else depends on the file
+
+def current_iterations(recalibrate: bool = False) -> int:
+    """
+    Work factor for new hashes. Measured once per host and target, then cached
+    in memory and in CALIBRATION_FILE, so only the very first use pays for it.
+    """
+    global _iterations
+    with _lock:
+        if _iterations is None or recalibrate:
+            cached = None if recalibrate else _load_calibration()
+            _iterations = cached if cached is not None else calibrate()
+            if cached is None:
+                _save_calibration(_iterations)
+        return _iterations
+
+def hash_password(password: str, iterations: Optional[int] = None, salt: Optional[bytes] = None) -> str:
+    n = iterations or current_iterations()
+    salt = salt if salt is not None else secrets.token_bytes(SALT_BYTES)
+    return "{}${}${}${}".format(ALGORITHM, n, _b64(salt), _b64(_pbkdf2(password, salt, n)))
+
+def _is_legacy(stored: str) -> bool:
+    """Unsalted sha512 hex digests written before PBKDF2 was introduced."""
+    return len(stored) == 128 and "$" not in stored
+
+def verify_password(password: str, stored: Optional[str]) -> bool:
+    if not stored:
+        return False
+    if _is_legacy(stored):
+        legacy = hashlib.sha512(password.encode()).hexdigest()
+        return hmac.compare_digest(legacy, stored.lower())
+    try:
+        algorithm, n, salt, digest = stored.split("$")
+        if algorithm != ALGORITHM:
+            return False
+        expected = _unb64(digest)
+        return hmac.compare_digest(_pbkdf2(password, _unb64(salt), int(n)), expected)
+    except (ValueError, TypeError):
+        return False
+
+def needs_rehash(stored: Optional[str]) -> bool:
+    """True for legacy hashes and for PBKDF2 hashes weaker than the current work factor."""
+    if not stored or _is_legacy(stored):
+        return True
+    try:
+        algorithm, n, _, _ = stored.split("$")
+        return algorithm != ALGORITHM or int(n) < current_iterations()
+    except ValueError:
+        return True
+
+def dummy_verify(password: str) -> None:
+    """Spend the same time as a real check, so unknown user names cannot be told apart by timing."""
+    _pbkdf2(password, b"\0" * SALT_BYTES, current_iterations())
+
+def benchmark(settings: Optional[Sequence[int]] = None, seconds: float = 1.0) -> List[Dict[str, Any]]:
+    """Hashes per second (and ms per login) at each iteration count."""
+    if not settings:
+        cur = current_iterations()
+        settings = sorted({MIN_ITERATIONS, cur // 2, cur, cur * 2})
+    rows = []
+    for n in settings:
+        count = 0
+        t0 = time.perf_counter()
+        while True:
+            _pbkdf2("benchmark", b"\0" * SALT_BYTES, n)
+            count += 1
+            elapsed = time.perf_counter() - t0
+            if elapsed >= seconds:
+                break
+        rows.append({
+            "iterations": n,
+            "hashes_per_sec": round(count / elapsed, 2),
+            "ms_per_hash": round(elapsed / count * 1000.0, 2),
+        })
+    return rows
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="PBKDF2 cost calibration and benchmark")
+    parser.add_argument("--recalibrate", action="store_true", help="re-measure the work factor for this host")
+    parser.add_argument("--iterations", type=int, nargs="*", help="settings to benchmark (default: around the calibrated one)")
+    parser.add_argument("--seconds", type=float, default=1.0, help="time spent per setting")
+    args = parser.parse_args(argv)
+
+    cur = current_iterations(recalibrate=args.recalibrate)
+    print("Calibrated work factor: {} iterations (target {:.0f} ms per login)".format(cur, TARGET_MS))
+    print("{:>12}  {:>12}  {:>10}".format("iterations", "hashes/sec", "ms/login"))
+    for row in benchmark(args.iterations, args.seconds):
+        mark = "  <- current" if row["iterations"] == cur else ""
+        print("{:>12}  {:>12.2f}  {:>10.2f}{}".format(row["iterations"], row["hashes_per_sec"], row["ms_per_hash"], mark))
+    return 0
+
+if __name__ == "__main__":
+    raise SystemExit(main())
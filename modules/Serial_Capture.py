@@ -0,0 +1,329 @@
+# This file captures raw serial traffic to a compact file and replays it through a port object, for offline debugging.
+#
+#   DCM_SERIAL_CAPTURE_DIR=captures python main.py     capture every connection a field unit makes
+#   python -m modules.Serial_Capture captures/x.scap   decode a capture offline and time the Rx paths
+#
+# File layout (little-endian):
+#   header, HEADER_LEN bytes: magic b"DCMSCAP1", version u16, header length u16,
+#                             start time f64 (Unix s), port (32 bytes UTF-8), baudrate u32
+#   chunks: t f64 (monotonic s since start), direction u8 (0 Rx, 1 Tx), length u32, bytes
+from __future__ import annotations
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+import argparse
+import bisect
+import json
+import os
+import struct
+import sys
+import threading
+import time
+
+MAGIC = b"DCMSCAP1"
+VERSION = 1
+HEADER_FMT = "<8sHHd32sI"
+HEADER_LEN = 64
+CHUNK = struct.Struct("<dBI")
+RX, TX = 0, 1
+FILE_SUFFIX = ".scap"
+ENV_CAPTURE_DIR = "DCM_SERIAL_CAPTURE_DIR"
+
+def read_header(raw: bytes) -> Dict[str, Any]:
+    if len(raw) < struct.calcsize(HEADER_FMT):
+        raise ValueError("file too short for a serial capture header")
+    magic, version, header_len, start, port, baud = struct.unpack_from(HEADER_FMT, raw)
+    if magic != MAGIC:
+        raise ValueError("not a serial capture (bad magic)")
+    if version != VERSION:
+        raise ValueError(f"unsupported serial capture version {version}")
+    return {
+        "version": version,
+        "header_len": header_len,
+        "start_time": start,
+        "port": port.rstrip(b"\0").decode("utf-8", "replace"),
+        "baudrate": baud,
+    }
+
+def iter_chunks(path: str) -> Iterator[Tuple[float, int, bytes]]:
+    """(t, direction, data) for every chunk; a truncated final chunk is ignored."""
+    with open(path, "rb") as f:
+        header = read_header(f.read(HEADER_LEN))
+        f.seek(header["header_len"])
+        while True:
+            head = f.read(CHUNK.size)
+            if len(head) < CHUNK.size:
+                return
+            t, direction, n = CHUNK.unpack(head)
+            data = f.read(n)
+            if len(data) < n:
+                return
+            yield t, direction, data
+
+class SerialTap:
+    """
+    Appends every chunk read from / written to a port to a capture file.
+
+    Each record() is one buffered write (13 bytes of framing plus the data),
+    safe to call from several threads; the file is flushed at most once per
+    flush_interval and on close().
+    """
+
+    def __init__(self, path: str, port: str = "", baudrate: int = 0,
+                 buffer_size: int = 64 * 1024, flush_interval: float = 1.0) -> None:
+        self.path = path
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._file = open(path, "wb", buffering=buffer_size)
+        head = struct.pack(HEADER_FMT, MAGIC, VERSION, HEADER_LEN, time.time(),
+                           (port or "").encode("utf-8")[:32], int(baudrate or 0))
+        self._file.write(head.ljust(HEADER_LEN, b"\0"))
+        self._t0 = time.monotonic()
+        self._lock = threading.Lock()
+        self._last_flush = self._t0
+        self.flush_interval = flush_interval
+        self.stats = {"rx_bytes": 0, "tx_bytes": 0, "chunks": 0}
+
+    @property
+    def closed(self) -> bool:
+        return self._file is None
+
+    def record(self, direction: int, data) -> None:
+        if not data:
+            return
+        now = time.monotonic()
+        with self._lock:
+            f = self._file
+            if f is None:
+                return
+            f.write(CHUNK.pack(now - self._t0, direction, len(data)))
+            f.write(data)
+            self.stats["chunks"] += 1
+            self.stats["tx_bytes" if direction == TX else "rx_bytes"] += len(data)
+            if now - self._last_flush >= self.flush_interval:
+                f.flush()
+                self._last_flush = now
+
+    def rx(self, data) -> None:
+        self.record(RX, data)
+
+    def tx(self, data) -> None:
+        self.record(TX, data)
+
+    def close(self) -> None:
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+class TappedPort:
+    """Wraps a serial.Serial-like port and logs its traffic to a SerialTap; everything else passes through."""
+
+    def __init__(self, port, tap: SerialTap) -> None:
+        self.__dict__["_port"] = port
+        self.__dict__["tap"] = tap
+
+    def __getattr__(self, attr):
+        return getattr(self._port, attr)
+
+    def __setattr__(self, attr, value):
+        # timeout / write_timeout etc. are set on the real port
+        setattr(self._port, attr, value)
+
+    def read(self, size: int = 1) -> bytes:
+        data = self._port.read(size)
+        self.tap.rx(data)
+        return data
+
+    def write(self, data) -> int:
+        n = self._port.write(data)
+        self.tap.tx(bytes(data[:n]) if n is not None and n < len(data) else data)
+        return n
+
+def capture_path(directory: str, port: str) -> str:
+    """Timestamped capture file name for a port, e.g. captures/ttyACM0_20250101_120000.scap."""
+    name = os.path.basename(str(port)).replace(":", "_") or "port"
+    return os.path.join(directory, "{}_{}{}".format(name, time.strftime("%Y%m%d_%H%M%S"), FILE_SUFFIX))
+
+class ReplayPort:
+    """
+    Plays the Rx side of a capture back through the serial.Serial interface
+    that SerialManager uses (read, write, in_waiting, timeout, is_open,
+    reset_input_buffer, ...), so read_packet() / read_frames() / parse_packet()
+    run on real traffic without a device.
+
+    speed=None releases every captured byte at once (deterministic, as fast as
+    the reader goes); speed=1.0 releases each chunk at its recorded time, 2.0
+    twice as fast, and so on. Writes are accepted and counted; with check_tx
+    they are compared with the captured Tx stream (see tx_mismatches).
+    """
+
+    def __init__(self, path: str, speed: Optional[float] = None, timeout: Optional[float] = 1.0,
+                 check_tx: bool = False) -> None:
+        with open(path, "rb") as f:
+            self.header = read_header(f.read(HEADER_LEN))
+        rx: List[bytes] = []
+        tx: List[bytes] = []
+        self._times: List[float] = []   # recorded time of each Rx chunk
+        self._ends: List[int] = []      # Rx stream offset after each chunk
+        total = 0
+        for t, direction, data in iter_chunks(path):
+            if direction == RX:
+                rx.append(data)
+                total += len(data)
+                self._times.append(t)
+                self._ends.append(total)
+            else:
+                tx.append(data)
+        self._rx = b"".join(rx)
+        self._tx = b"".join(tx) if check_tx else b""
+        self.port = path
+        self.baudrate = self.header["baudrate"]
+        self.speed = speed
+        self.timeout = timeout
+        self.write_timeout = None
+        self.check_tx = check_tx
+        self.is_open = True
+        self.tx_bytes = 0
+        self.tx_mismatches = 0
+        self._pos = 0
+        self._t_open = time.monotonic()
+
+    # ---------- clock ----------
+    def _clock(self) -> float:
+        return (time.monotonic() - self._t_open) * self.speed
+
+    def _available(self) -> int:
+        """Rx stream offset released so far."""
+        if self.speed is None:
+            return len(self._rx)
+        i = bisect.bisect_right(self._times, self._clock())
+        return self._ends[i - 1] if i else 0
+
+    def _next_due(self) -> Optional[float]:
+        """Wall-clock seconds until the next unreleased chunk, None when none are left."""
+        i = bisect.bisect_right(self._ends, self._available())
+        if i >= len(self._times):
+            return None
+        return max(0.0, (self._times[i] - self._clock()) / self.speed)
+
+    @property
+    def exhausted(self) -> bool:
+        return self._pos >= len(self._rx)
+
+    # ---------- serial.Serial interface ----------
+    @property
+    def in_waiting(self) -> int:
+        return self._available() - self._pos
+
+    def read(self, size: int = 1) -> bytes:
+        deadline = None if self.timeout is None else time.monotonic() + self.timeout
+        out = bytearray()
+        while len(out) < size:
+            avail = self._available() - self._pos
+            if avail > 0:
+                take = min(avail, size - len(out))
+                out += self._rx[self._pos:self._pos + take]
+                self._pos += take
+                continue
+            due = None if self.speed is None else self._next_due()
+            if due is None:
+                break  # end of capture: behaves like a read timeout
+            if deadline is not None:
+                left = deadline - time.monotonic()
+                if left <= 0:
+                    break
+                due = min(due, left)
+            time.sleep(due)
+        return bytes(out)
+
+    def write(self, data) -> int:
+        data = bytes(data)
+        if self.check_tx:
+            expected = self._tx[self.tx_bytes:self.tx_bytes + len(data)]
+            if expected != data:
+                self.tx_mismatches += 1
+        self.tx_bytes += len(data)
+        return len(data)
+
+    def flush(self) -> None:
+        pass
+
+    def reset_input_buffer(self) -> None:
+        # At recorded speed bytes that have "arrived" are dropped, like a UART flush.
+        # At max speed everything has arrived, so dropping would lose the whole capture.
+        if self.speed is not None:
+            self._pos = max(self._pos, self._available())
+
+    def reset_output_buffer(self) -> None:
+        pass
+
+    def open(self) -> None:
+        self.is_open = True
+
+    def close(self) -> None:
+        self.is_open = False
+
+def analyze(path: str) -> Dict[str, Any]:
+    """Replay a capture at max speed through the framing / decode paths and time them."""
+    try:
+        from .Serial_Manager import SerialManager
+    except ImportError:
+        from modules.Serial_Manager import SerialManager
+
+    # read_packet() + parse_packet(), frame by frame
+    sm = SerialManager()
+    sm.attach_port(ReplayPort(path, timeout=0))
+    counts: Dict[str, int] = {}
+    t0 = time.perf_counter()
+    while True:
+        pkt = sm.read_packet(timeout=0.001)
+        if not pkt:
+            break
+        parsed = sm.parse_packet(pkt)
+        key = "0x{:02X}".format(parsed["fn"]) if parsed else "rejected"
+        counts[key] = counts.get(key, 0) + 1
+    packet_s = time.perf_counter() - t0
+    framer = sm.framer.stats()
+
+    # read_frames() + vectorized egram decode
+    sm = SerialManager()
+    port = ReplayPort(path, timeout=0)
+    sm.attach_port(port)
+    samples = 0
+    SerialManager.decode_egram_batch(b"")  # loads numpy and the frame dtype outside the timed loop
+    t0 = time.perf_counter()
+    while not port.exhausted or sm._rx_frames:
+        frames = sm.read_frames(idle_wait=0)
+        if not frames:
+            break
+        samples += len(sm.decode_egram_batch(frames))
+    batch_s = time.perf_counter() - t0
+
+    with open(path, "rb") as f:
+        header = read_header(f.read(HEADER_LEN))
+    chunks = list(iter_chunks(path))
+    frames = sum(counts.values())
+    return {
+        "capture": header,
+        "duration_s": round(chunks[-1][0], 3) if chunks else 0.0,
+        "rx_bytes": sum(len(c[2]) for c in chunks if c[1] == RX),
+        "tx_bytes": sum(len(c[2]) for c in chunks if c[1] == TX),
+        "frames_by_fn": counts,
+        "framer": framer,
+        "read_packet_frames_per_sec": round(frames / packet_s, 1) if packet_s > 0 else None,
+        "egram_samples": samples,
+        "read_frames_samples_per_sec": round(samples / batch_s, 1) if batch_s > 0 else None,
+    }
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Decode and time a raw serial capture offline")
+    parser.add_argument("capture", help="capture file (.scap)")
+    args = parser.parse_args(argv)
+    try:
+        report = analyze(args.capture)
+    except (OSError, ValueError) as e:
+        print("Cannot read {}: {}".format(args.capture, e), file=sys.stderr)
+        return 2
+    print(json.dumps(report, indent=2))
+    return 0
+
+if __name__ == "__main__":
+    raise SystemExit(main())
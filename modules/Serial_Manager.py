@@ -1,8 +1,13 @@
 # This file is used to implement serial communication for hiding the details
 from __future__ import annotations
-from typing import Optional, Dict, Any, Tuple
+from typing import Optional, Dict, Any, Tuple, List, TYPE_CHECKING
+from collections import deque
+import functools
+import os
 import serial
 import struct
+import threading
+import time
 from serial.tools import list_ports
 
 # ---------- Protocol constants ----------
@@ -13,12 +18,37 @@ K_PPARAMS = 0x55  # Send parameters
 K_EGRAM   = 0x47  # Start egram stream
 K_ESTOP   = 0x62  # Stop egram stream
 N_DATA    = 30    # Every packet must carry exactly 30 data bytes
-
-# Activity threshold mapping (kept here for completeness; not used in packing)
-ACTIVITY_MAP: Dict[str, int] = {
-    "V-Low": 0, "Low": 1, "Med-Low": 2, "Med": 3,
-    "Med-High": 4, "High": 5, "V-High": 6,
-}
+FRAME_LEN = 4 + N_DATA + 1  # SYNC, SOH, FnCode, HdrChk, Data[30], DataChk
+PREAMBLE  = bytes([SYNC, SOH])
+
+if TYPE_CHECKING:
+    import numpy as np
+    from .Async_Serial import AsyncSerialManager
+
+# Egram frame view: fn code plus atrial/ventricular raw*100 at data offsets 12/14.
+# Built on first use: numpy is only needed once an egram stream runs.
+_EGRAM_FRAME_DTYPE = None
+
+def egram_frame_dtype():
+    global _EGRAM_FRAME_DTYPE
+    if _EGRAM_FRAME_DTYPE is None:
+        import numpy as np
+        _EGRAM_FRAME_DTYPE = np.dtype({
+            "names": ["fn", "atr", "ven"],
+            "formats": ["u1", "<u2", "<u2"],
+            "offsets": [2, 4 + 12, 4 + 14],
+            "itemsize": FRAME_LEN,
+        })
+    return _EGRAM_FRAME_DTYPE
+
+try:
+    from .Param_Codec import PARAM_CODEC, PARAM_FORMAT, PARAM_KEYS, ACTIVITY_MAP
+    from .Serial_Capture import SerialTap, TappedPort, capture_path, ENV_CAPTURE_DIR
+    from .Transport import Transport, open_transport
+except ImportError:
+    from modules.Param_Codec import PARAM_CODEC, PARAM_FORMAT, PARAM_KEYS, ACTIVITY_MAP
+    from modules.Serial_Capture import SerialTap, TappedPort, capture_path, ENV_CAPTURE_DIR
+    from modules.Transport import Transport, open_transport
 
 def f_chk(data: bytes) -> int:
     """Compute XOR checksum over given bytes (returns uint8)."""
@@ -27,6 +57,29 @@ def f_chk(data: bytes) -> int:
         checksum ^= byte
     return checksum & 0xFF
 
+def _chk_ok(expected: int, received: int) -> bool:
+    """
+    Accept a checksum byte if it matches, or if it is 0 ("not filled in"):
+    the current firmware, like older DCM builds, sends 0 in both slots.
+    """
+    return received == expected or received == 0
+
+def _fill_frame(buf, fn_code: int) -> None:
+    """
+    Complete a FRAME_LEN buffer in place: header [SYNC, SOH, FnCode], header
+    checksum, and the data checksum over the 30 data bytes already in buf[4:34].
+    """
+    buf[0] = SYNC
+    buf[1] = SOH
+    buf[2] = fn_code
+    buf[3] = SYNC ^ SOH ^ fn_code
+    buf[FRAME_LEN - 1] = f_chk(memoryview(buf)[4:FRAME_LEN - 1])
+
+def _command_frame(fn_code: int) -> bytes:
+    buf = bytearray(FRAME_LEN)
+    _fill_frame(buf, fn_code)
+    return bytes(buf)
+
 def _u8(x: Any) -> int:
     """Clamp to uint8, raising on overflow."""
     v = int(x)
@@ -41,16 +94,143 @@ def _u16(x: Any) -> int:
         raise ValueError(f"uint16 out of range: {v}")
     return v
 
+# Data-less command frames never change: build them once
+COMMAND_FRAMES: Dict[int, bytes] = {fn: _command_frame(fn) for fn in (K_ECHO, K_EGRAM, K_ESTOP)}
+_ZEROS = memoryview(bytes(N_DATA))
+
+class PacketFramer:
+    """
+    Incremental frame extractor for the SYNC/SOH protocol.
+
+    Bytes can be fed in any split (partial reads, several frames at once);
+    complete frames come out of feed(). When the stream is misaligned the
+    framer drops bytes until the next SYNC/SOH pair whose checksums verify,
+    so a single lost byte costs one frame instead of the rest of the session.
+    """
+
+    def __init__(self, verify_checksums: bool = True) -> None:
+        self.verify_checksums = verify_checksums
+        self._buf = bytearray()
+        self._synced = True
+        self.frames = 0           # frames emitted
+        self.resyncs = 0          # times alignment was lost and recovered
+        self.discarded_bytes = 0  # bytes dropped while hunting for a frame
+        self.bad_checksums = 0    # candidate frames rejected by f_chk
+
+    @property
+    def pending(self) -> int:
+        """Number of buffered bytes not yet part of an emitted frame."""
+        return len(self._buf)
+
+    def reset(self) -> None:
+        """Drop buffered bytes (e.g. after a reconnect or buffer flush)."""
+        self._buf.clear()
+        self._synced = True
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "frames": self.frames,
+            "resyncs": self.resyncs,
+            "discarded_bytes": self.discarded_bytes,
+            "bad_checksums": self.bad_checksums,
+        }
+
+    def _discard(self, n: int) -> None:
+        self.discarded_bytes += n
+        self._synced = False
+
+    def _frame_ok(self, buf: bytearray, start: int) -> bool:
+        """Validate the candidate frame at buf[start:start+FRAME_LEN]."""
+        if not self.verify_checksums:
+            return True
+        end = start + FRAME_LEN
+        hdr_chk, data_chk = buf[start + 3], buf[end - 1]
+        hdr_exp = f_chk(buf[start:start + 3])
+        data_exp = f_chk(buf[start + 4:end - 1])
+        if not (_chk_ok(hdr_exp, hdr_chk) and _chk_ok(data_exp, data_chk)):
+            return False
+        if hdr_chk == hdr_exp and (data_chk == data_exp or data_exp == 0):
+            return True
+        # Unfilled checksums cannot tell a real frame from a SYNC/SOH pair inside
+        # egram data, so additionally require the next frame to start right after.
+        if len(buf) >= end + 2:
+            return buf[end] == SYNC and buf[end + 1] == SOH
+        return True
+
+    def feed(self, data: bytes = b"") -> List[bytes]:
+        """Append received bytes and return every complete, valid frame."""
+        buf = self._buf
+        if data:
+            buf += data
+        frames: List[bytes] = []
+        pos = 0
+        n = len(buf)
+        while True:
+            i = buf.find(PREAMBLE, pos)
+            if i < 0:
+                # Keep a trailing SYNC: it may be the first half of the next preamble
+                keep = 1 if n > pos and buf[n - 1] == SYNC else 0
+                if n - keep > pos:
+                    self._discard(n - keep - pos)
+                pos = n - keep
+                break
+            if i > pos:
+                self._discard(i - pos)
+                pos = i
+            if n - pos < FRAME_LEN:
+                break
+            if self._frame_ok(buf, pos):
+                frames.append(bytes(buf[pos:pos + FRAME_LEN]))
+                pos += FRAME_LEN
+                self.frames += 1
+                if not self._synced:
+                    self.resyncs += 1
+                    self._synced = True
+            else:
+                self.bad_checksums += 1
+                self._discard(1)
+                pos += 1
+        if pos:
+            del buf[:pos]
+        return frames
+
+def _serialized(method):
+    """Run a SerialManager method while holding its io_lock."""
+    @functools.wraps(method)
+    def locked(self, *args, **kwargs):
+        with self.io_lock:
+            return method(self, *args, **kwargs)
+    return locked
+
 class SerialManager:
     """Minimal, transport-only serial layer: connect / send / read / parse."""
 
     def __init__(self, port: str = "COM3", baudrate: int = 115200,
-                 timeout: float = 1.0, write_timeout: float = 1.0) -> None:
-        self.port = port
+                 timeout: float = 1.0, write_timeout: float = 1.0,
+                 transport: Optional[Transport] = None) -> None:
+        self.port = getattr(transport, "port", None) or port
         self.baudrate = baudrate
         self.timeout = timeout
         self.write_timeout = write_timeout
+        # Fixed byte transport (see Transport); None opens one from self.port on each connect()
+        self.transport = transport
         self.serial_port: Optional[serial.Serial] = None
+        self.framer = PacketFramer()
+        self._rx_frames: deque = deque()  # frames decoded but not yet returned
+        # Reusable Tx frame; build_data_frame() fills it in place
+        self._tx = bytearray(FRAME_LEN)
+        self._tx_view = memoryview(self._tx)
+        # Optional raw traffic capture (see Serial_Capture); _auto_tap is one opened
+        # per connection because DCM_SERIAL_CAPTURE_DIR is set
+        self.tap: Optional[SerialTap] = None
+        self._auto_tap = False
+        # One thread at a time on the port: an egram reader, a parameter upload and
+        # ConnectionManager's reconnect all share this manager (re-entrant, so
+        # PacemakerCommunication can hold it across connect() + flush_buffers())
+        self.io_lock = threading.RLock()
+        # Async_Serial.AsyncSerialManager that owns the receive side while set:
+        # read_packet() / read_frames() then wait on its queues instead of the port
+        self.reader: Optional[AsyncSerialManager] = None
 
     # ---------- Internal helper ----------
     def _port(self) -> serial.Serial:
@@ -79,17 +259,29 @@ class SerialManager:
         if write_timeout is not None:
             self.write_timeout = write_timeout
 
+    @_serialized
     def connect(self) -> bool:
-        """Open serial port; returns True on success."""
+        """Open the transport (a serial port unless self.port is a tcp:// / replay:// / loop:// URL)."""
         try:
+            self._release_reader()
             if self.serial_port and getattr(self.serial_port, "is_open", False):
                 self.serial_port.close()
-            self.serial_port = serial.Serial(
-                port=self.port,
+            transport = self.transport or open_transport(
+                self.port,
                 baudrate=self.baudrate,      # 57,600 baud as required
                 timeout=self.timeout,
                 write_timeout=self.write_timeout,
             )
+            transport.timeout = self.timeout
+            transport.open()
+            self.serial_port = transport
+            self._reset_rx()
+            capture_dir = os.environ.get(ENV_CAPTURE_DIR)
+            if self.tap is None and capture_dir:
+                self.tap = SerialTap(capture_path(capture_dir, self.port), self.port, self.baudrate)
+                self._auto_tap = True
+            if self.tap is not None:
+                self.serial_port = TappedPort(self.serial_port, self.tap)
             return self.serial_port.is_open
 
         except Exception as e:
@@ -97,8 +289,10 @@ class SerialManager:
             self.serial_port = None
             return False
 
+    @_serialized
     def disconnect(self) -> None:
         """Close serial port safely; idempotent."""
+        self._release_reader()
         try:
             if self.serial_port and getattr(self.serial_port, "is_open", False):
                 self.serial_port.close()
@@ -106,50 +300,119 @@ class SerialManager:
             pass
         finally:
             self.serial_port = None
+            self._reset_rx()
+            if self._auto_tap:
+                self.stop_capture()
+
+    @_serialized
+    def attach_port(self, port) -> bool:
+        """
+        Use an already open serial.Serial-like object instead of opening self.port,
+        e.g. a Serial_Capture.ReplayPort to run recorded traffic through this class.
+        """
+        self.disconnect()
+        self.serial_port = TappedPort(port, self.tap) if self.tap is not None else port
+        self.port = getattr(port, "port", self.port)
+        self._reset_rx()
+        return self.is_connected()
+
+    # ---------- Traffic capture ----------
+    @_serialized
+    def start_capture(self, path: str) -> SerialTap:
+        """Log every byte read and written (from now on, across reconnects) to path."""
+        self.stop_capture()
+        self.tap = SerialTap(path, self.port, self.baudrate)
+        if self.serial_port is not None:
+            self.serial_port = TappedPort(self.serial_port, self.tap)
+        return self.tap
+
+    @_serialized
+    def stop_capture(self) -> None:
+        tap, self.tap = self.tap, None
+        self._auto_tap = False
+        if isinstance(self.serial_port, TappedPort):
+            self.serial_port = self.serial_port._port
+        if tap is not None:
+            tap.close()
+
+    def _link_lost(self, err: Exception) -> None:
+        """
+        I/O on an open port failed (cable pulled, device reset): close it, so
+        is_connected() reports the drop instead of every later call failing quietly.
+        """
+        if self.serial_port is not None:
+            print(f"[SerialManager] Lost {self.port}: {err}")
+        self.disconnect()
+
+    def _release_reader(self) -> None:
+        reader, self.reader = self.reader, None
+        if reader is not None:
+            reader._release()
+
+    def _reset_rx(self) -> None:
+        """Forget partially received frames."""
+        self.framer.reset()
+        self._rx_frames.clear()
 
     def is_connected(self) -> bool:
         """Check if the port is open."""
         return bool(self.serial_port and getattr(self.serial_port, "is_open", False))
 
     # ---------- Low-level send / receive ----------
+    @_serialized
     def send_data(self, data: bytes) -> bool:
         """
         Send raw bytes; returns True only if all bytes were written.
         High-level callers should prefer the packet helpers below.
         """
-        if not isinstance(data, (bytes, bytearray)):
+        if not isinstance(data, (bytes, bytearray, memoryview)):
             return False
         try:
             sp = self._port()
             n = sp.write(data)
             sp.flush()
             return n == len(data)
+        except serial.SerialTimeoutException:
+            return False
+        except OSError as e:
+            self._link_lost(e)
+            return False
         except Exception:
             return False
 
+    @_serialized
     def read_data(self, num_bytes: int = 1) -> bytes:
         """Read a specific number of bytes (may return fewer on timeout)."""
+        if self.reader is not None:
+            return b""  # raw bytes belong to the async reader's framer
         try:
             sp = self._port()
             return sp.read(num_bytes)
         except Exception:
             return b""
 
+    @_serialized
     def flush_buffers(self) -> bool:
         """Clear input/output buffers."""
         try:
             sp = self._port()
             sp.reset_input_buffer()
             sp.reset_output_buffer()
+            self._reset_rx()
+            if self.reader is not None:
+                self.reader.discard_input()
             return True
         except Exception:
             return False
 
+    @_serialized
     def wait_for_response(self, expected_bytes: int = 1, timeout: float = 2.0) -> bytes:
         """
         Temporarily override port timeout and read up to expected_bytes.
         Use read_packet() when you expect a full framed packet.
         """
+        if self.reader is not None:
+            return b""
         try:
             sp = self._port()
             old_timeout = sp.timeout
@@ -162,129 +425,153 @@ class SerialManager:
             return b""
 
     # ---------- Packet building (Tx) ----------
-    def _build_header(self, fn_code: int) -> Tuple[bytes, int]:
+    @_serialized
+    def build_packet(self, fn_code: int, data: bytes = b'') -> bytes:
         """
-        Build the 3-byte header [SYNC, SOH, FnCode] and compute the header checksum.
-        The header checksum is XOR over these three bytes.
+        Frame up to N_DATA bytes (zero padded) with header and both checksums.
+        Data-less commands come from the precomputed COMMAND_FRAMES.
         """
-        header = bytes([SYNC, SOH, _u8(fn_code)])
-        header_chksum = 0
-        return header, header_chksum
-
-    def build_packet(self, fn_code: int, data: bytes = b'') -> bytes:
-        header, header_chksum = self._build_header(fn_code)
-
-        if data is None:
+        fn_code = _u8(fn_code)
+        if not data:
+            frame = COMMAND_FRAMES.get(fn_code)
+            if frame is not None:
+                return frame
             data = b''
 
-        if len(data) > N_DATA:
-            raise ValueError(f"data length {len(data)} exceeds N_DATA={N_DATA}")
-
-        if len(data) < N_DATA:
-            data = data + bytes(N_DATA - len(data))
+        n = len(data)
+        if n > N_DATA:
+            raise ValueError(f"data length {n} exceeds N_DATA={N_DATA}")
 
-        data_chksum = 0
+        tx = self._tx
+        tx[4:4 + n] = data
+        if n < N_DATA:
+            tx[4 + n:4 + N_DATA] = _ZEROS[:N_DATA - n]
+        _fill_frame(tx, fn_code)
+        return bytes(tx)
 
-        return header + bytes([header_chksum]) + data + bytes([data_chksum])
+    @_serialized
+    def build_data_frame(self, mode, params) -> memoryview:
+        """
+        Pack a K_PPARAMS frame straight into the reusable Tx buffer and return a
+        view of it. The view is only valid until the next build on this manager,
+        so callers sharing the manager across threads hold io_lock from the build
+        until the send; use build_data_packet() when the frame has to be kept.
+        """
+        PARAM_CODEC.pack_into(self._tx, 4, params, mode)
+        _fill_frame(self._tx, K_PPARAMS)
+        return self._tx_view
 
+    @_serialized
     def build_data_packet(self, mode, params):
-        p = params or {}
-
-        pacing_mode = int(p.get("p_pacingMode", mode))
-        lrl = int(p.get("p_LRL", 60))
-        url = int(p.get("p_URL", 120))
-        max_sensor_rate = int(p.get("p_MaxSensorRate", url))
-
-        arp = int(p.get("p_ARP", 320))
-        vrp = int(p.get("p_VRP", 320))
-        pvarp = int(p.get("p_PVARP", 250))
-
-        a_pw_ms = float(p.get("p_aPaceWidth", 1.0))
-        v_pw_ms = float(p.get("p_vPaceWidth", 1.0))
-
-        a_amp_raw = int(p.get("p_aPaceAmp", 500))
-        v_amp_raw = int(p.get("p_vPaceAmp", 500))
-
-        a_sens_raw = int(p.get("p_aSens", 500))
-        v_sens_raw = int(p.get("p_vSens", 500))
-
-        activity_th = int(p.get("p_ActivityThreshold", 0))
-        reaction_time = int(p.get("p_ReactionTime", 30))
-        response_factor = int(p.get("p_ResponseFactor", 8))
-        recovery_time = int(p.get("p_RecoveryTime", 5))
-
-        hyst_flag = int(p.get("p_hysteresisFlag", 0))
-        rate_smoothing = int(p.get("p_RateSmoothing", 0))
-
-        payload = struct.pack(
-            "<BBBBHHHBBHHHHBBBBBB4x",
-            pacing_mode,
-            lrl,
-            url,
-            max_sensor_rate,
-            arp,
-            vrp,
-            pvarp,
-            int(round(a_pw_ms)),
-            int(round(v_pw_ms)),
-            a_amp_raw,
-            v_amp_raw,
-            a_sens_raw,
-            v_sens_raw,
-            activity_th,
-            reaction_time,
-            response_factor,
-            recovery_time,
-            hyst_flag,
-            rate_smoothing,
-        )
-
-        return self.build_packet(K_PPARAMS, payload)
+        """K_PPARAMS frame for firmware-keyed params (layout: Param_Codec.PARAM_FIELDS)."""
+        return bytes(self.build_data_frame(mode, params))
 
+    @_serialized
     def send_parameters(self, params: Dict[str, Any], mode: int = 0) -> bool:
         """High-level helper to send programmable parameters."""
         try:
-            packet = self.build_data_packet(mode=mode, params=params)
+            frame = self.build_data_frame(mode=mode, params=params)
         except Exception:
             return False
-        return self.send_data(packet)
+        return self.send_data(frame)
 
     def request_parameters(self) -> bool:
         """Send K_ECHO (30 zero data bytes, DataChk=0)."""
-        return self.send_data(self.build_packet(K_ECHO))
+        return self.send_data(COMMAND_FRAMES[K_ECHO])
 
     def start_egram(self) -> bool:
         """Send K_EGRAM (30 zero data bytes, DataChk=0)."""
-        return self.send_data(self.build_packet(K_EGRAM))
+        return self.send_data(COMMAND_FRAMES[K_EGRAM])
 
     def stop_egram(self) -> bool:
         """Send K_ESTOP (30 zero data bytes, DataChk=0)."""
-        return self.send_data(self.build_packet(K_ESTOP))
+        return self.send_data(COMMAND_FRAMES[K_ESTOP])
 
 
     def read_packet(self, timeout: float = 2.0) -> bytes:
+        """
+        Return the next complete frame, or b"" if none arrives within timeout.
+        Reads go through self.framer, so the stream re-aligns after lost bytes.
+        While an async reader owns the port this is its next non-egram frame,
+        and the wait does not hold io_lock.
+        """
+        reader = self.reader
+        if reader is not None:
+            return reader.wait_reply(timeout)
+        return self._read_packet(timeout)
+
+    @_serialized
+    def _read_packet(self, timeout: float) -> bytes:
+        if self.reader is not None:
+            return self.reader.wait_reply(timeout)  # installed while we waited for the lock
+        if self._rx_frames:
+            return self._rx_frames.popleft()
         try:
             sp = self._port()
             old_to = sp.timeout
-            sp.timeout = timeout
-
-            total_len = 4 + N_DATA + 1
-            pkt = sp.read(total_len)
-            sp.timeout = old_to
-
-            if len(pkt) != total_len:
-                return b""
-            return pkt
+            deadline = time.monotonic() + timeout
+            try:
+                while True:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        return b""
+                    sp.timeout = remaining
+                    # Ask for exactly what completes a frame, or everything already waiting
+                    need = max(FRAME_LEN - self.framer.pending, 1)
+                    chunk = sp.read(max(need, sp.in_waiting))
+                    if not chunk:
+                        return b""
+                    frames = self.framer.feed(chunk)
+                    if frames:
+                        self._rx_frames.extend(frames)
+                        return self._rx_frames.popleft()
+            finally:
+                sp.timeout = old_to
+        except OSError as e:
+            self._link_lost(e)
+            return b""
         except Exception:
             return b""
 
-    def parse_packet(self, pkt: bytes) -> Optional[Dict[str, Any]]:
-        expected_len = 4 + N_DATA + 1
+    def read_frames(self, idle_wait: float = 0.01) -> bytes:
+        """
+        Drain the UART input buffer in one read and return every complete frame,
+        concatenated (len is a multiple of FRAME_LEN). Unlike read_packet() this
+        never touches the port timeout: when nothing is waiting it sleeps
+        idle_wait once and returns what arrived meanwhile. While an async reader
+        owns the port only its queued K_EGRAM frames are returned (replies stay
+        for read_packet()), waiting up to idle_wait for the first.
+        """
+        reader = self.reader
+        if reader is not None:
+            return reader.wait_egram(idle_wait)
+        return self._read_frames(idle_wait)
+
+    @_serialized
+    def _read_frames(self, idle_wait: float) -> bytes:
+        if self.reader is not None:
+            return self.reader.wait_egram(idle_wait)
+        frames = list(self._rx_frames)
+        self._rx_frames.clear()
+        try:
+            sp = self._port()
+            waiting = sp.in_waiting
+            if not waiting and not frames:
+                time.sleep(idle_wait)
+                waiting = sp.in_waiting
+            if waiting:
+                frames.extend(self.framer.feed(sp.read(waiting)))
+        except OSError as e:
+            self._link_lost(e)
+        except Exception:
+            pass
+        return b"".join(frames)
 
-        if len(pkt) != expected_len:
+    def parse_packet(self, pkt: bytes) -> Optional[Dict[str, Any]]:
+        if len(pkt) != FRAME_LEN:
             return None
 
-        sync, soh, fn, hdr_chk = pkt[0], pkt[1], pkt[2], pkt[3] # hdr_chk is not used since don't have the time to implement
+        sync, soh, fn, hdr_chk = pkt[0], pkt[1], pkt[2], pkt[3]
         if sync != SYNC or soh != SOH:
             return None
 
@@ -292,64 +579,22 @@ class SerialManager:
         data_end = 4 + N_DATA
         data = pkt[data_start:data_end]
 
-        return {"fn": fn, "data": data, "header_ok": True, "data_ok": True}
+        header_ok = _chk_ok(f_chk(pkt[0:3]), hdr_chk)
+        data_ok = _chk_ok(f_chk(data), pkt[data_end])
+        if not (header_ok and data_ok):
+            return None
 
-    @staticmethod
-    def decode_params(data: bytes) -> Dict[str, Any]:
-        if len(data) != N_DATA:
-            raise ValueError("params data length error")
-
-        (pacing_mode,
-        lrl,
-        url,
-        max_sensor_rate,
-        arp,
-        vrp,
-        pvarp,
-        a_pw,
-        v_pw,
-        a_amp_raw,
-        v_amp_raw,
-        a_sens_raw,
-        v_sens_raw,
-        activity_th,
-        reaction_time,
-        response_factor,
-        recovery_time,
-        hyst_flag,
-        rate_smoothing) = struct.unpack("<BBBBHHHBBHHHHBBBBBB4x", data)
-
-        rate_smoothing_map = {
-            0: "Off", 1: "3%", 2: "6%", 3: "9%", 4: "12%",
-            5: "15%", 6: "18%", 7: "21%", 8: "25%"
-        }
+        return {"fn": fn, "data": data, "header_ok": header_ok, "data_ok": data_ok}
 
-        activity_threshold_map = {
-            0: "V-Low", 1: "Low", 2: "Med-Low", 3: "Med",
-            4: "Med-High", 5: "High", 6: "V-High"
-        }
+    @staticmethod
+    def decode_raw_params(data: bytes) -> Dict[str, int]:
+        """Unpack a parameter block into firmware units, keyed like build_data_packet() input."""
+        return PARAM_CODEC.unpack_raw(data)
 
-        return {
-            "Pacing_Mode": pacing_mode,  # Changed from pacing_mode to Pacing_Mode
-            "Lower_Rate_Limit": lrl,
-            "Upper_Rate_Limit": url, 
-            "Maximum_Sensor_Rate": max_sensor_rate,
-            "ARP": arp,
-            "VRP": vrp,
-            "PVARP": pvarp,
-            "Atrial_Pulse_Width": float(a_pw),
-            "Ventricular_Pulse_Width": float(v_pw),
-            "Atrial_Amplitude": round(a_amp_raw / 100.0, 1),
-            "Ventricular_Amplitude": round(v_amp_raw / 100.0, 1),
-            "Atrial_Sensitivity": round(a_sens_raw / 100.0, 1),
-            "Ventricular_Sensitivity": round(v_sens_raw / 100.0, 1),
-            "Activity_Threshold": activity_threshold_map.get(activity_th, "Med"),
-            "Reaction_Time": reaction_time,
-            "Response_Factor": response_factor,
-            "Recovery_Time": recovery_time,
-            "Hysteresis": "On" if hyst_flag else "Off",
-            "Rate_Smoothing": rate_smoothing_map.get(rate_smoothing, "Off"),
-        }
+    @staticmethod
+    def decode_params(data: bytes) -> Dict[str, Any]:
+        """Unpack a parameter block into UI names and units."""
+        return PARAM_CODEC.decode(data)
     
     # def decode_egram(self, data: bytes) -> Dict[str, Any]:
     #     if len(data) != N_DATA:
@@ -378,4 +623,25 @@ class SerialManager:
         return {
             "m_araw": atr_amp,
             "m_vraw": ven_amp,
-        }
\ No newline at end of file
+        }
+
+    @staticmethod
+    def decode_egram_batch(frames: bytes) -> np.ndarray:
+        """
+        Vectorized decode_egram() over concatenated frames from read_frames().
+        Returns an (n, 2) float array of [atrial, ventricular] amplitudes, one
+        row per K_EGRAM frame; other frames in the block (e.g. K_PPARAMS / K_ECHO
+        replies arriving mid-stream) are skipped.
+        """
+        if len(frames) % FRAME_LEN:
+            raise ValueError(f"frame block length {len(frames)} is not a multiple of {FRAME_LEN}")
+        import numpy as np
+        rec = np.frombuffer(frames, dtype=egram_frame_dtype())
+        rec = rec[rec["fn"] == K_EGRAM]
+        out = np.empty((len(rec), 2), dtype=np.float64)
+        out[:, 0] = rec["atr"]
+        out[:, 1] = rec["ven"]
+        # Same scaling as decode_egram(): 5.0 - raw / 100
+        out *= -0.01
+        out += 5.0
+        return out
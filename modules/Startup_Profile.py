@@ -0,0 +1,129 @@
+# This file measures DCM start-up: per-module import cost and time to the first window, against a budget.
+#
+#   DCM_IMPORT_PROFILE=1 python main.py      report on stderr once the login window is up
+#   python -m modules.Startup_Profile        import main.py's start-up set only; exit 1 if over budget
+#
+# DCM_STARTUP_BUDGET_MS overrides the default budget.
+from __future__ import annotations
+from typing import Dict, List, Optional, Tuple
+import importlib.abc
+import os
+import sys
+import time
+
+ENV_FLAG = "DCM_IMPORT_PROFILE"
+ENV_BUDGET = "DCM_STARTUP_BUDGET_MS"
+DEFAULT_BUDGET_MS = 400.0
+
+_t0: Optional[float] = None
+_last_mark: Optional[float] = None
+_records: List[Tuple[str, float, float]] = []   # (module, cumulative ms, self ms) in completion order
+_reported = 0
+_stack: List[List[float]] = []                  # [start, time spent in nested imports]
+
+class _TimingLoader:
+    """Wraps a module's loader and times exec_module(); everything else is delegated."""
+
+    def __init__(self, loader, name: str) -> None:
+        self._loader = loader
+        self._name = name
+
+    def __getattr__(self, attr):
+        return getattr(self._loader, attr)
+
+    def create_module(self, spec):
+        return self._loader.create_module(spec)
+
+    def exec_module(self, module) -> None:
+        frame = [time.perf_counter(), 0.0]
+        _stack.append(frame)
+        try:
+            self._loader.exec_module(module)
+        finally:
+            _stack.pop()
+            total = time.perf_counter() - frame[0]
+            if _stack:
+                _stack[-1][1] += total
+            _records.append((self._name, total * 1000.0, (total - frame[1]) * 1000.0))
+
+class _TimingFinder(importlib.abc.MetaPathFinder):
+    """Asks the real finders for the spec, then swaps in a timing loader."""
+
+    def find_spec(self, fullname, path, target=None):
+        for finder in sys.meta_path:
+            if finder is self or not hasattr(finder, "find_spec"):
+                continue
+            spec = finder.find_spec(fullname, path, target)
+            if spec is None:
+                continue
+            if spec.loader is not None and hasattr(spec.loader, "exec_module"):
+                spec.loader = _TimingLoader(spec.loader, fullname)
+            return spec
+        return None
+
+def budget_ms() -> float:
+    try:
+        return float(os.environ.get(ENV_BUDGET, DEFAULT_BUDGET_MS))
+    except ValueError:
+        print(f"[startup] Ignoring {ENV_BUDGET}={os.environ[ENV_BUDGET]!r}; "
+              f"using {DEFAULT_BUDGET_MS:.0f} ms", file=sys.stderr)
+        return DEFAULT_BUDGET_MS
+
+def enable() -> None:
+    """Start timing imports (call before the heavy imports happen)."""
+    global _t0, _last_mark
+    if _t0 is not None:
+        return
+    _t0 = _last_mark = time.perf_counter()
+    sys.meta_path.insert(0, _TimingFinder())
+
+def checkpoint(label: str, top: int = 15, check_budget: bool = False) -> Dict[str, float]:
+    """
+    Print the modules imported since the previous checkpoint, heaviest first,
+    and the wall time to this point. With check_budget the elapsed time since
+    enable() is compared with the budget. Returns the summary numbers.
+    """
+    global _last_mark, _reported
+    if _t0 is None:
+        return {}
+    now = time.perf_counter()
+    new = _records[_reported:]
+    _reported = len(_records)
+    # Self times add up to the total without counting nested imports twice
+    import_ms = sum(self_ms for _, _, self_ms in new)
+    summary = {
+        "since_start_ms": (now - _t0) * 1000.0,
+        "since_last_ms": (now - _last_mark) * 1000.0,
+        "import_ms": import_ms,
+        "modules": float(len(new)),
+    }
+    _last_mark = now
+
+    out = sys.stderr
+    print(f"[startup] {label}: {summary['since_start_ms']:.1f} ms since start "
+          f"(+{summary['since_last_ms']:.1f} ms), {len(new)} modules imported "
+          f"in {import_ms:.1f} ms", file=out)
+    if new:
+        print(f"[startup]   {'cumulative':>10}  {'self':>8}  module", file=out)
+        for name, cum, self_ms in sorted(new, key=lambda r: r[1], reverse=True)[:top]:
+            print(f"[startup]   {cum:>8.1f}ms  {self_ms:>6.1f}ms  {name}", file=out)
+    if check_budget:
+        limit = budget_ms()
+        verdict = "within" if summary["since_start_ms"] <= limit else "OVER"
+        print(f"[startup] {verdict} budget of {limit:.0f} ms", file=out)
+        summary["over_budget"] = float(summary["since_start_ms"] > limit)
+    return summary
+
+def main() -> int:
+    """Import what main.py needs before the login window and check it against the budget."""
+    enable()
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    import main as _dcm_main  # noqa: F401  (import only; no window is created)
+    summary = checkpoint("main.py imports", top=25, check_budget=True)
+    heavy = [m for m in ("matplotlib", "numpy", "serial") if m in sys.modules]
+    if heavy:
+        print(f"[startup] loaded before login: {', '.join(heavy)}", file=sys.stderr)
+    return 1 if summary.get("over_budget") or heavy else 0
+
+if __name__ == "__main__":
+    raise SystemExit(main())
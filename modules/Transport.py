@@ -0,0 +1,324 @@
+# This file defines the byte transports SerialManager can run over: pyserial, in-memory loopback, TCP and capture replay.
+#
+# A transport is the subset of the serial.Serial API that SerialManager uses
+# (open / close / read / write / in_waiting / timeout / reset buffers), so the
+# framing and protocol code above it does not care where the bytes come from.
+# open_transport() picks one from a port string:
+#   "COM3", "/dev/ttyACM0"        pyserial
+#   "tcp://bench-box:7000"        raw TCP socket (e.g. ser2net on a remote bench)
+#   "replay://captures/x.scap"    Serial_Capture file; "?speed=1" for recorded timing
+#   "loop://"                     in-memory virtual pacemaker (Device_Simulator)
+from __future__ import annotations
+from typing import Callable, Optional, Tuple
+from urllib.parse import urlsplit, parse_qs
+from abc import ABC, abstractmethod
+import socket
+import threading
+import time
+
+try:
+    from .Serial_Capture import ReplayPort
+except ImportError:
+    from modules.Serial_Capture import ReplayPort
+
+class TransportError(OSError):
+    """Raised by transports for I/O on a closed or broken link (like serial.SerialException)."""
+
+class Transport(ABC):
+    """Base class: a re-openable byte pipe with pyserial-style timeouts."""
+
+    def __init__(self, port: str = "", timeout: Optional[float] = 1.0,
+                 write_timeout: Optional[float] = 1.0) -> None:
+        self.port = port
+        self.timeout = timeout
+        self.write_timeout = write_timeout
+        self.is_open = False
+
+    def open(self) -> None:
+        self.is_open = True
+
+    def close(self) -> None:
+        self.is_open = False
+
+    @abstractmethod
+    def read(self, size: int = 1) -> bytes:
+        """Up to size bytes; fewer once timeout expires."""
+
+    @abstractmethod
+    def write(self, data) -> int:
+        """Send data; returns the number of bytes written."""
+
+    @property
+    @abstractmethod
+    def in_waiting(self) -> int:
+        """Bytes that can be read without waiting."""
+
+    def flush(self) -> None:
+        pass
+
+    def reset_input_buffer(self) -> None:
+        pass
+
+    def reset_output_buffer(self) -> None:
+        pass
+
+class SerialTransport(Transport):
+    """A real COM / tty port through pyserial."""
+
+    def __init__(self, port: str, baudrate: int = 115200, timeout: Optional[float] = 1.0,
+                 write_timeout: Optional[float] = 1.0) -> None:
+        self._sp = None
+        super().__init__(port, timeout, write_timeout)
+        self.baudrate = baudrate
+
+    # timeout changes (read_packet() sets one per read) must reach the real port
+    @property
+    def timeout(self) -> Optional[float]:
+        return self._timeout
+
+    @timeout.setter
+    def timeout(self, value: Optional[float]) -> None:
+        self._timeout = value
+        if self._sp is not None:
+            self._sp.timeout = value
+
+    @property
+    def is_open(self) -> bool:
+        return bool(self._sp is not None and self._sp.is_open)
+
+    @is_open.setter
+    def is_open(self, value: bool) -> None:
+        pass  # derived from the pyserial object
+
+    def open(self) -> None:
+        import serial
+        self.close()
+        self._sp = serial.Serial(port=self.port, baudrate=self.baudrate,
+                                 timeout=self._timeout, write_timeout=self.write_timeout)
+
+    def close(self) -> None:
+        sp, self._sp = self._sp, None
+        if sp is not None:
+            sp.close()
+
+    def _serial(self):
+        if self._sp is None:
+            raise TransportError("port not open")
+        return self._sp
+
+    def read(self, size: int = 1) -> bytes:
+        return self._serial().read(size)
+
+    def write(self, data) -> int:
+        return self._serial().write(data)
+
+    @property
+    def in_waiting(self) -> int:
+        return self._serial().in_waiting
+
+    def flush(self) -> None:
+        self._serial().flush()
+
+    def reset_input_buffer(self) -> None:
+        self._serial().reset_input_buffer()
+
+    def reset_output_buffer(self) -> None:
+        self._serial().reset_output_buffer()
+
+    def fileno(self) -> int:
+        """The OS descriptor of the open port, for select() / event loops."""
+        return self._serial().fileno()
+
+class BufferedTransport(Transport):
+    """
+    Transport whose receive side is an in-memory buffer filled by _deliver()
+    (from a peer or a reader thread); read() follows pyserial's rules: wait up
+    to timeout for `size` bytes, None waits forever, 0 returns what is there.
+    on_receive, when set, is called (on the delivering thread) after new bytes
+    arrive or the link closes, so an event loop can read without polling.
+    """
+
+    def __init__(self, port: str = "", timeout: Optional[float] = 1.0,
+                 write_timeout: Optional[float] = 1.0) -> None:
+        super().__init__(port, timeout, write_timeout)
+        self._rx = bytearray()
+        self._cond = threading.Condition()
+        self.on_receive: Optional[Callable[[], None]] = None
+
+    def _notify(self) -> None:
+        callback = self.on_receive
+        if callback is not None:
+            callback()
+
+    def _deliver(self, data) -> None:
+        with self._cond:
+            self._rx += data
+            self._cond.notify_all()
+        self._notify()
+
+    def open(self) -> None:
+        with self._cond:
+            self._rx.clear()
+            self.is_open = True
+
+    def close(self) -> None:
+        with self._cond:
+            self.is_open = False
+            self._cond.notify_all()
+        self._notify()
+
+    @property
+    def in_waiting(self) -> int:
+        return len(self._rx)
+
+    def read(self, size: int = 1) -> bytes:
+        timeout = self.timeout
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._cond:
+            while len(self._rx) < size and self.is_open:
+                if deadline is None:
+                    self._cond.wait()
+                    continue
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                self._cond.wait(remaining)
+            out = bytes(self._rx[:size])
+            del self._rx[:size]
+            return out
+
+    def reset_input_buffer(self) -> None:
+        with self._cond:
+            self._rx.clear()
+
+class LoopbackTransport(BufferedTransport):
+    """
+    In-memory link. Written bytes go straight to the peer's receive buffer, or
+    to on_write (e.g. a PacemakerSimulator's feed()) which may answer
+    synchronously through _deliver(); no OS buffers, no baud rate.
+    """
+
+    def __init__(self, peer: Optional["LoopbackTransport"] = None,
+                 on_write: Optional[Callable[[bytes], None]] = None, port: str = "loop://",
+                 timeout: Optional[float] = 1.0, write_timeout: Optional[float] = 1.0) -> None:
+        super().__init__(port, timeout, write_timeout)
+        self.peer = peer
+        self.on_write = on_write
+
+    def write(self, data) -> int:
+        if not self.is_open:
+            raise TransportError("port not open")
+        data = bytes(data)
+        if self.on_write is not None:
+            self.on_write(data)
+        elif self.peer is not None:
+            self.peer._deliver(data)
+        return len(data)
+
+def loopback_pair(timeout: Optional[float] = 1.0) -> Tuple[LoopbackTransport, LoopbackTransport]:
+    """Two connected, already open ends: what one writes the other reads."""
+    a = LoopbackTransport(port="loop://a", timeout=timeout)
+    b = LoopbackTransport(peer=a, port="loop://b", timeout=timeout)
+    a.peer = b
+    a.open()
+    b.open()
+    return a, b
+
+class TcpTransport(BufferedTransport):
+    """Raw TCP byte stream (ser2net / socat on a remote bench box); a reader thread fills the buffer."""
+
+    def __init__(self, host: str, port: int, timeout: Optional[float] = 1.0,
+                 write_timeout: Optional[float] = 1.0, connect_timeout: float = 3.0) -> None:
+        super().__init__("tcp://{}:{}".format(host, port), timeout, write_timeout)
+        self.host = host
+        self.tcp_port = port
+        self.connect_timeout = connect_timeout
+        self._sock: Optional[socket.socket] = None
+        self._reader: Optional[threading.Thread] = None
+
+    def open(self) -> None:
+        self.close()
+        sock = socket.create_connection((self.host, self.tcp_port), self.connect_timeout)
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)  # frames are small; don't batch them
+        sock.settimeout(None)
+        self._sock = sock
+        super().open()
+        self._reader = threading.Thread(target=self._read_loop, args=(sock,), daemon=True)
+        self._reader.start()
+
+    def _read_loop(self, sock: socket.socket) -> None:
+        while True:
+            try:
+                data = sock.recv(4096)
+            except OSError:
+                data = b""
+            if not data:
+                break
+            self._deliver(data)
+        if sock is self._sock:
+            BufferedTransport.close(self)  # peer went away
+
+    def close(self) -> None:
+        sock, self._sock = self._sock, None
+        super().close()
+        if sock is not None:
+            try:
+                sock.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+            sock.close()
+        if self._reader is not None:
+            self._reader.join(timeout=1.0)
+            self._reader = None
+
+    def write(self, data) -> int:
+        sock = self._sock
+        if sock is None or not self.is_open:
+            raise TransportError("port not open")
+        sock.settimeout(self.write_timeout)
+        try:
+            sock.sendall(data)
+        except socket.timeout:
+            raise TransportError("write timeout")
+        finally:
+            sock.settimeout(None)
+        return len(data)
+
+class ReplayTransport(ReplayPort, Transport):
+    """Serial_Capture.ReplayPort as a transport: open() rewinds to the start of the capture."""
+
+    def open(self) -> None:
+        self._pos = 0
+        self._t_open = time.monotonic()
+        self.tx_bytes = 0
+        self.tx_mismatches = 0
+        self.is_open = True
+
+def open_transport(spec: str, baudrate: int = 115200, timeout: Optional[float] = 1.0,
+                   write_timeout: Optional[float] = 1.0):
+    """Transport for a port string (see the top of this file); not opened yet."""
+    spec = str(spec)
+    if "://" not in spec:
+        return SerialTransport(spec, baudrate, timeout, write_timeout)
+    url = urlsplit(spec)
+    if url.scheme == "tcp":
+        if not url.hostname or not url.port:
+            raise ValueError("TCP transport needs tcp://host:port, got {}".format(spec))
+        return TcpTransport(url.hostname, url.port, timeout, write_timeout)
+    if url.scheme == "replay":
+        query = parse_qs(url.query)
+        speed = float(query["speed"][0]) if "speed" in query else None
+        t = ReplayTransport(url.netloc + url.path, speed=speed, timeout=timeout)
+        t.is_open = False
+        return t
+    if url.scheme == "loop":
+        try:
+            from .Device_Simulator import LoopbackSimulator
+        except ImportError:
+            from modules.Device_Simulator import LoopbackSimulator
+        query = parse_qs(url.query)
+        rate = float(query["rate"][0]) if "rate" in query else 200.0
+        sim = LoopbackSimulator(egram_rate=rate, timeout=timeout)
+        sim.start()
+        return sim.transport
+    raise ValueError("unknown transport: {}".format(spec))
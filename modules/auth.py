@@ -1,8 +1,157 @@
 # This file is used to do the user authentication, including registration and login.
-import json, hashlib, os
+import json, os, stat, tempfile, threading
+
+try:
+    from . import Password_Hasher as hasher
+except ImportError:
+    from modules import Password_Hasher as hasher
 
 USER_FILE = "data/users.json"
 DEVICE_FILE = "data/Pacemaker_device_name.json" # File to store known device port/name mappings
+# Registration cap; None = unlimited (shared lab deployments). DCM_MAX_USERS=<n> restores a cap.
+MAX_USERS = int(os.environ["DCM_MAX_USERS"]) if os.environ.get("DCM_MAX_USERS") else None
+
+def _atomic_write_text(path, text):
+    """Write text to a temp file in the same directory, then rename it over path."""
+    directory = os.path.dirname(path) or "."
+    os.makedirs(directory, exist_ok=True)
+    try:
+        mode = stat.S_IMODE(os.stat(path).st_mode)
+    except FileNotFoundError:
+        mode = 0o644
+    fd, tmp = tempfile.mkstemp(prefix=".tmp-", suffix=".json", dir=directory)
+    try:
+        with os.fdopen(fd, "w") as f:
+            f.write(text)
+            f.flush()
+            os.fsync(f.fileno())
+        # mkstemp makes the file 0600; keep the permissions the file had
+        os.chmod(tmp, mode)
+        os.replace(tmp, path)
+    except BaseException:
+        try:
+            os.unlink(tmp)
+        except OSError:
+            pass
+        raise
+
+def _atomic_write_json(path, data):
+    _atomic_write_text(path, json.dumps(data, indent=2))
+
+class UserStore:
+    """
+    users.json held in memory as a name -> record dict.
+
+    The file is parsed once and only re-read when its mtime / size / inode
+    changes (e.g. another DCM instance registered someone), so lookups are a
+    dict access. Every change is written back atomically (temp file + rename),
+    so a crash mid-write can never leave a truncated user file. Each record's
+    JSON text is cached, so a write re-encodes only the records that changed.
+    """
+
+    def __init__(self, path=USER_FILE, max_users=MAX_USERS):
+        self.path = path
+        self.max_users = max_users
+        self._users = {}
+        self._encoded = {}  # name -> indented JSON text of the record
+        self._stamp = None
+        self._lock = threading.RLock()
+
+    def _file_stamp(self):
+        try:
+            st = os.stat(self.path)
+        except FileNotFoundError:
+            return None
+        return (st.st_mtime_ns, st.st_size, st.st_ino)
+
+    def _refresh(self):
+        stamp = self._file_stamp()
+        if stamp == self._stamp:
+            return
+        users = {}
+        if stamp is not None:
+            with open(self.path, "r") as f:
+                for u in json.load(f):
+                    users.setdefault(u.get("name"), u)  # first entry wins, as the old linear scan did
+        self._users = users
+        self._encoded = {}
+        self._stamp = stamp
+
+    def _save(self):
+        # Same layout as json.dump(list, indent=2), assembled from cached records
+        parts = []
+        for name, record in self._users.items():
+            text = self._encoded.get(name)
+            if text is None:
+                text = self._encoded[name] = "  " + json.dumps(record, indent=2).replace("\n", "\n  ")
+            parts.append(text)
+        _atomic_write_text(self.path, "[\n" + ",\n".join(parts) + "\n]" if parts else "[]")
+        self._stamp = self._file_stamp()
+
+    def __len__(self):
+        with self._lock:
+            self._refresh()
+            return len(self._users)
+
+    def __contains__(self, name):
+        return self.get(name) is not None
+
+    def get(self, name):
+        """The stored record for name, or None."""
+        with self._lock:
+            self._refresh()
+            return self._users.get(name)
+
+    def names(self):
+        with self._lock:
+            self._refresh()
+            return list(self._users)
+
+    def add(self, name, record):
+        """Store a new user; returns "added", "exists" or "full"."""
+        with self._lock:
+            self._refresh()
+            if name in self._users:
+                return "exists"
+            if self.max_users is not None and len(self._users) >= self.max_users:
+                return "full"
+            # "name" first, the order users.json has always had
+            entry = {"name": name}
+            entry.update((k, v) for k, v in record.items() if k != "name")
+            self._users[name] = entry
+            self._save()
+            return "added"
+
+    def update(self, name, **fields):
+        """Change fields of an existing user; False if there is no such user."""
+        with self._lock:
+            self._refresh()
+            if name not in self._users:
+                return False
+            self._users[name] = dict(self._users[name], **fields)
+            self._encoded.pop(name, None)
+            self._save()
+            return True
+
+    def remove(self, name):
+        with self._lock:
+            self._refresh()
+            if self._users.pop(name, None) is None:
+                return False
+            self._encoded.pop(name, None)
+            self._save()
+            return True
+
+_stores = {}
+_stores_lock = threading.Lock()
+
+def get_user_store(path=USER_FILE):
+    """The shared UserStore for a users file (one per path per process)."""
+    with _stores_lock:
+        store = _stores.get(path)
+        if store is None:
+            store = _stores[path] = UserStore(path)
+        return store
 
 def load_users():
     if not os.path.exists(USER_FILE):
@@ -11,49 +160,41 @@ def load_users():
         return json.load(f)
 
 def save_users(users):
-    with open(USER_FILE, "w") as f:
-        json.dump(users, f, indent=2)
+    _atomic_write_json(USER_FILE, users)
 
 def hash_password(password):
-    return hashlib.sha512(password.encode()).hexdigest()
+    return hasher.hash_password(password)
 
 def register_user(name, password):
-    users = load_users()
-    if len(users) >= 10:
+    status = get_user_store().add(name, {"password": hash_password(password)})
+    if status == "full":
         return "Max users reached"
-    if any(u["name"] == name for u in users):
+    if status == "exists":
         return "User already exists"
-    users.append({"name": name, "password": hash_password(password)})
-    save_users(users)
     return "Registration successful"
 
 def login_user(name, password):
-    users = load_users()
-    hashed = hash_password(password)
-    for u in users:
-        if u["name"] == name and u["password"] == hashed:
-            return "Login successful"
-    return "Invalid credentials"
+    store = get_user_store()
+    user = store.get(name)
+    if user is None:
+        hasher.dummy_verify(password)
+        return "Invalid credentials"
+    stored = user.get("password")
+    if not hasher.verify_password(password, stored):
+        return "Invalid credentials"
+    # Legacy sha512 or weaker-than-current hashes are upgraded while we know the password
+    if hasher.needs_rehash(stored):
+        try:
+            store.update(name, password=hash_password(password))
+        except OSError:
+            pass
+    return "Login successful"
 
 def logout_account(username, user_data_file):
-    import json, os
-
     if not os.path.exists(user_data_file):
         return False
-    
     try:
-        with open(user_data_file, "r") as f:
-            users = json.load(f)
-        
-        original_count = len(users)
-        users = [u for u in users if u.get("name") != username]
-        
-        if len(users) < original_count:  
-            with open(user_data_file, "w") as f:
-                json.dump(users, f, indent=2)
-            return True
-        else:
-            return False  
+        return get_user_store(user_data_file).remove(username)
     except Exception:
         return False
 
@@ -103,8 +244,7 @@ def load_device_names():
 
 def save_device_names(device_data):
     """Saves the entire device data object back to the JSON file."""
-    with open(DEVICE_FILE, "w") as f:
-        json.dump(device_data, f, indent=2)
+    _atomic_write_json(DEVICE_FILE, device_data)
 
 def get_last_connected_device():
     """Reads and returns only the 'last_connected_device_name' string."""
@@ -117,6 +257,15 @@ def set_last_connected_device(device_name: str):
     device_data["last_connected_device_name"] = device_name
     save_device_names(device_data)
 
+def get_device_port(device_name: str):
+    """Returns the port recorded for a logical device name, or None if it is unknown."""
+    if not device_name:
+        return None
+    for device in load_device_names().get("devices", []):
+        if device.get("name") == device_name:
+            return device.get("port")
+    return None
+
 def get_or_assign_device_name(port_name: str) -> str:
     """
     Gets a device's logical name based on its port.
@@ -1,12 +1,12 @@
 # This files contains the all windows operations, including the pop up/close and display.
+import queue
 import tkinter as tk
 from tkinter import ttk, messagebox
 from modules.mode_config import ParamEnum
 from modules.ParamOps import ParameterManager, ParameterWindow
-from modules.EGdiagram import EgramWindow
 from modules.Help_Window import HelpWindow
-from modules.Communication import PacemakerCommunication
-from modules.Serial_Manager import SerialManager
+# EGdiagram (matplotlib) and the serial stack (pyserial, numpy) are imported on
+# first use below, so they do not add to the time before the window shows
 
 # NEW: Import the function to read the last saved device
 from modules.auth import get_last_connected_device, logout_account
@@ -29,6 +29,8 @@ class DCMInterface:
         
         self.is_connected = False
         self.comm_manager = None
+        self.link = None  # ConnectionManager: port hot-plug watching and automatic reconnect
+        self.bridge = None  # TkAsyncBridge: runs port I/O off the Tk thread (see _submit)
 
         # initialize parameters
         self.param_window = None 
@@ -81,14 +83,17 @@ class DCMInterface:
     
         self.port_combobox = ttk.Combobox(
             port_frame,
-            values=self.get_available_ports(),
+            values=[],
             state="readonly",
             width=25
         )
         self.port_combobox.pack(side="left", padx=5)
+        # First scan once the window is drawn (this is what loads pyserial)
+        self.root.after_idle(self._start_link)
         
         ttk.Button(port_frame, text="Refresh Ports", command=self.refresh_ports).pack(side="left", padx=5)
-        ttk.Button(port_frame, text="Connect", command=self.toggle_connect).pack(side="left", padx=5)
+        self.connect_btn = ttk.Button(port_frame, text="Connect", command=self.toggle_connect)
+        self.connect_btn.pack(side="left", padx=5)
 
         self.update_status()
 
@@ -99,7 +104,9 @@ class DCMInterface:
 
     def update_status(self):
         """Update connection status and device ID"""
-        if self.is_connected:
+        if self.is_connected and self.link is not None and self.link.reconnecting:
+            self.status_label.config(text="Status: Link lost, reconnecting ⏳", foreground="orange")
+        elif self.is_connected:
             self.status_label.config(text="Status: Connected ✅", foreground="green")
         else:
             self.status_label.config(text="Status: Disconnected ❌", foreground="red")
@@ -112,6 +119,10 @@ class DCMInterface:
     
     def sign_out(self):
         """Sign out and return to welcome window"""
+        if self.link is not None:
+            self.link.stop()
+        if self.bridge is not None:
+            self.bridge.close()
         self.root.destroy()
         import main
         main.main()
@@ -139,7 +150,8 @@ class DCMInterface:
         except (tk.TclError, AttributeError):
             self.param_window = None
 
-        self.param_window = ParameterWindow(self.root, self.param_manager, self.comm_manager)
+        self.param_window = ParameterWindow(self.root, self.param_manager, self.comm_manager,
+                                            bridge=self._get_bridge() if self.comm_manager else None)
     
     def open_help_window(self):
         """Open help window"""
@@ -162,6 +174,7 @@ class DCMInterface:
                 self.egram_window.window.winfo_exists()):
                 try:
                     self.egram_window.comm_manager = self.comm_manager
+                    self.egram_window.link = self.link
                 except Exception:
                     pass
                 self.egram_window.window.lift()  
@@ -169,13 +182,82 @@ class DCMInterface:
         except tk.TclError:
             self.egram_window = None
 
-        self.egram_window = EgramWindow(self.root, self.comm_manager)
+        from modules.EGdiagram import EgramWindow
+        self.egram_window = EgramWindow(self.root, self.comm_manager, link=self.link)
     
     def get_available_ports(self):
         """Get available serial ports"""
-        ports = PacemakerCommunication().list_ports()
+        from modules.Serial_Manager import SerialManager
+        ports = SerialManager.list_available_ports()
         return ports if ports else ["No ports available"]
 
+    def _start_link(self):
+        """Fill the port list, then keep it current and the connection up in the background."""
+        from modules.Connection_Manager import ConnectionManager
+        self._set_ports(self.get_available_ports())
+        self.link = ConnectionManager()
+        self.link.start()
+        self._poll_link()
+
+    def _set_ports(self, ports):
+        """Show a new port list, keeping the selection or preferring the last device's port."""
+        self.port_combobox.configure(values=ports)
+        current = self.port_combobox.get()
+        if current in ports or not ports or "No ports" in ports[0]:
+            return
+        from modules.auth import get_device_port
+        last_port = get_device_port(self.last_device_id)
+        self.port_combobox.set(last_port if last_port in ports else ports[0])
+
+    def _poll_link(self):
+        """Apply ConnectionManager events on the Tk thread."""
+        link = self.link
+        if link is None:
+            return
+        try:
+            while True:
+                kind, info = link.events.get_nowait()
+                if kind == "ports":
+                    self._set_ports(info["ports"] or ["No ports available"])
+                elif kind == "reconnected":
+                    self.update_status()
+                    self.new_device_warning_label.config(
+                        text=f"Reconnected in {info['reconnect_ms']:.0f} ms after a {info['outage_s']:.1f} s outage",
+                        foreground="green")
+                elif kind == "lost":
+                    self.update_status()
+                elif kind == "gave_up":
+                    self.is_connected = False
+                    self.last_device_id = self.device_id
+                    self.device_id = None
+                    self.update_status()
+                    messagebox.showerror("Disconnected", f"Lost {info['device'] or info['port']} "
+                                         f"and could not reconnect within {info['outage_s']:.0f} s.")
+        except queue.Empty:
+            pass
+        except tk.TclError:
+            return  # window closed
+        self.root.after(250, self._poll_link)
+
+    def _get_bridge(self):
+        if self.bridge is None:
+            from modules.Async_Serial import TkAsyncBridge
+            self.bridge = TkAsyncBridge(self.root)
+        return self.bridge
+
+    def _submit(self, coro, on_done):
+        """Run a comm coroutine on the bridge; on_done(result) runs on the Tk thread, the Connect button waits."""
+        self.connect_btn.configure(state="disabled")
+
+        def done(result):
+            self.connect_btn.configure(state="normal")
+            on_done(result)
+
+        def failed(exc):
+            self.connect_btn.configure(state="normal")
+            messagebox.showerror("Error", f"Serial error: {exc}")
+        self._get_bridge().submit(coro, on_done=done, on_error=failed)
+
     def refresh_ports(self):
         """Refresh available serial ports"""
         ports = self.get_available_ports()
@@ -186,19 +268,13 @@ class DCMInterface:
 
     def toggle_connect(self):
         """Connect or disconnect serial port"""
-        
+        from modules.Communication import PacemakerCommunication
+
         # --- Handle disconnect ---
         if self.is_connected and self.comm_manager is not None:
-            self.comm_manager.disconnect()
-            self.is_connected = False
-            
-            # Store the ID of the device we just disconnected
-            self.last_device_id = self.device_id 
-            self.device_id = None # Clear current device
-            
-            self.new_device_warning_label.config(text="") # Clear warning on disconnect
-            self.update_status()
-            messagebox.showinfo("Disconnected", "Serial connection closed.")
+            if self.link is not None:
+                self.link.detach()  # deliberate: no reconnect
+            self._submit(self.comm_manager.core.disconnect(), self._on_disconnected)
             return
 
         # --- Handle connect ---
@@ -206,40 +282,59 @@ class DCMInterface:
         if not selected_port or "No ports" in selected_port:
             messagebox.showerror("Error", "No valid port selected")
             return
-        
-        self.comm_manager = PacemakerCommunication(port=selected_port)
-        
-        if self.comm_manager.connect():
-            self.is_connected = True
-            
+
+        comm = PacemakerCommunication(port=selected_port)
+
+        async def open_link():
             # Get the logical name (this also saves it as "last_connected" in the file)
-            info = self.comm_manager.check_device_identity()
-            current_device_name = info.get("device_id")
-            self.device_id = current_device_name if current_device_name is not None else "--"
-            
-            # Compare current name to the one loaded at startup (or from last disconnect)
-            if (self.last_device_id is not None and 
-                self.device_id != "--" and 
-                self.device_id != self.last_device_id):
-                
-                self.new_device_warning_label.config(
-                    text="🔔 New device detected!", foreground="red"
-                )
-            else:
-                self.new_device_warning_label.config(text="")
-            
-            assigned_name = self.device_id if self.device_id != "--" else selected_port
-            messagebox.showinfo("Success", f"Connected to {assigned_name} (on {selected_port})")
-        
-        else:
+            if not await comm.core.connect():
+                return None
+            return await comm.core.check_device_identity()
+        self._submit(open_link(), lambda info: self._on_connected(comm, selected_port, info))
+
+    def _on_disconnected(self, _result):
+        self.is_connected = False
+
+        # Store the ID of the device we just disconnected
+        self.last_device_id = self.device_id
+        self.device_id = None # Clear current device
+
+        self.new_device_warning_label.config(text="") # Clear warning on disconnect
+        self.update_status()
+        messagebox.showinfo("Disconnected", "Serial connection closed.")
+
+    def _on_connected(self, comm, selected_port, info):
+        if info is None:
             # Connect failed
             self.is_connected = False
             self.device_id = None
             self.comm_manager = None
+            self.update_status()
             messagebox.showerror("Error", f"Failed to connect to {selected_port}")
-        
+            return
+
+        self.comm_manager = comm
+        self.is_connected = True
+        current_device_name = info.get("device_id")
+        self.device_id = current_device_name if current_device_name is not None else "--"
+
+        # Compare current name to the one loaded at startup (or from last disconnect)
+        if (self.last_device_id is not None and
+            self.device_id != "--" and
+            self.device_id != self.last_device_id):
+
+            self.new_device_warning_label.config(
+                text="🔔 New device detected!", foreground="red"
+            )
+        else:
+            self.new_device_warning_label.config(text="")
+        if self.link is not None:
+            self.link.attach(self.comm_manager)
         self.update_status()
 
+        assigned_name = self.device_id if self.device_id != "--" else selected_port
+        messagebox.showinfo("Success", f"Connected to {assigned_name} (on {selected_port})")
+
     def save_parameters(self):
         """Save current parameters to JSON"""
         self.param_manager.save_params()
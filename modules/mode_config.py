@@ -403,4 +403,24 @@ class ParamEnum:
             "PVARP":                   self.get_PVARP(),
             "Hysteresis":              self.get_Hysteresis(),
             "Rate_Smoothing":          self.get_Rate_Smoothing(),
-        }
\ No newline at end of file
+        }
+    # apply a parameters.json-style dict through the setters; returns {key: error message}
+    def update_from_dict(self, data):
+        pending = {k: v for k, v in data.items() if k != "Pacing_Mode"}
+        errors = {}
+        # second pass: cross-checked pairs (e.g. LRL <= URL) may depend on a key set later
+        for _ in range(2):
+            errors = {}
+            for key, val in pending.items():
+                setter = getattr(self, f"set_{key}", None)
+                if setter is None:
+                    errors[key] = f"Unknown parameter {key}"
+                    continue
+                try:
+                    setter(val)
+                except (TypeError, ValueError) as e:
+                    errors[key] = str(e)
+            if not errors:
+                break
+            pending = {k: pending[k] for k in errors}
+        return errors